@@ -61,9 +61,64 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, '../var/db/sopin.sqlite3'),
+
+        # Seconds to keep the connection of each WSGI thread open between
+        # requests; 0 to close it after every request, None for no limit
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Verify persistent connections at the start of each request (see
+# data/health.py)
+DB_HEALTH_CHECKS = True
+
+# Pragmas set on every new SQLite connection, in the given order (see
+# data/pragmas.py). WAL journal lets readers continue while a purchase is
+# being written, and busy_timeout (ms) makes writers wait for each other
+# instead of failing with "database is locked".
+# https://www.sqlite.org/pragma.html
+
+SQLITE_PRAGMAS = (
+    ('busy_timeout', 5000),
+    ('journal_mode', 'wal'),
+    ('synchronous', 'normal'),
+    ('cache_size', -16384),  # KiB
+    ('mmap_size', 64 * 1024 * 1024),
+)
+
+# Cache
+# https://docs.djangoproject.com/en/1.8/topics/cache/
+# Cached data is invalidated by the process that changes it, so the cache must
+# be shared by all the WSGI daemon processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, '../var/cache'),
+        # Two entries per item (latest purchase and it's version) and one per
+        # cached page, kept well below the limit so versions are not culled
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Template fragments are keyed on the version of the data they are
+    # rendered from, never invalidated, so each process can keep it's own
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Tests use in memory caches, see app/test_runner.py
+TEST_RUNNER = 'app.test_runner.TestRunner'
+
+# Parsed templates are kept in memory by each process, except while debugging
+if not DEBUG:
+    TEMPLATE_LOADERS = (
+        ('django.template.loaders.cached.Loader', (
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        )),
+    )
+
 # Internationalization
 # https://docs.djangoproject.com/en/1.6/topics/i18n/
 
@@ -84,5 +139,51 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, '../var/www/')
 
+# Files concatenated and minified in to each bundle by collectstatic (see
+# ui/assets.py), loaded in templates with {% bundle %} tag
+STATIC_BUNDLES = {
+    'css/base.bundle.css': ('css/font-awesome.css', 'css/bootstrap.css',
+                            'css/sopin.css'),
+    'js/base.bundle.js': ('js/jquery.js', 'js/bootstrap.js'),
+    'css/home.bundle.css': ('css/home.css', ),
+    'css/items.bundle.css': ('css/datepicker.css', ),
+    'js/items.bundle.js': ('js/jquery.validate.js',
+                           'js/bootstrap-datepicker.js'),
+}
+
+# Parts of the bundles not used by the pages are pruned by collectstatic (see
+# ui/assets.py). CSS rules and jQuery plugins (of the STATIC_PRUNE_PLUGINS
+# sources) are kept when their class names, ids or plugin names are found in
+# the STATIC_PRUNE_CONTENT files (relative to BASE_DIR) or the JavaScript
+# bundles, or match one of the STATIC_PRUNE_SAFELIST patterns; the ones added
+# by scripts with names built at run time.
+STATIC_PRUNE_CONTENT = ('ui/templates', 'ui/forms.py')
+STATIC_PRUNE_PLUGINS = ('js/bootstrap.js', )
+STATIC_PRUNE_SAFELIST = (
+    r'^alert-',  # Message tags, items/list.html
+)
+
+# Icon fonts trimmed by collectstatic to the icons used in templates (see
+# ui/icons.py), as the icon class prefix, stylesheet defining the icon classes
+# and the font file name with out extension
+STATIC_ICON_FONTS = (
+    ('fa', 'css/font-awesome.css', 'fonts/fontawesome-webfont'),
+    ('glyphicon', 'css/bootstrap.css', 'fonts/glyphicons-halflings-regular'),
+)
+
+# Static files saved with gzip (and brotli, when the module is installed)
+# compressed variants by collectstatic, for Apache to serve as they are
+STATIC_COMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.ttf')
+
+# Content hashed file names, so the files can be cached by browsers forever.
+# Source files are served as they are while debugging.
+if not DEBUG:
+    STATICFILES_STORAGE = 'ui.storage.BundleStorage'
+
 SITE_TITLE = 'Sopin'
+ITEMS_PAGE_SIZE = 50
+
+# Purchases older than this many days are moved to the archive by
+# "manage.py rollup --archive"
+PURCHASE_RETENTION_DAYS = 2 * 365
 VERSION = (0, 1, 'alpha')
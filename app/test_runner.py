@@ -0,0 +1,70 @@
+#  app/test_runner.py: Test runner for the project
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Test runner for the project """
+
+import unittest
+
+from django.core.cache import caches
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+# Tests never touch the file based cache of the site, nor see what was cached
+# by the previous test
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test',
+    },
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test_template_fragments',
+    },
+}
+
+
+class _ClearCachesMixin(object):
+    """ Test result mixin clearing the caches before each test """
+
+    def startTest(self, test):
+        for cache in caches.all():
+            cache.clear()
+
+        super(_ClearCachesMixin, self).startTest(test)
+
+
+class TestRunner(DiscoverRunner):
+    """ Test runner using TEST_CACHES in place of the configured caches """
+
+    def setup_test_environment(self, **kwargs):
+        super(TestRunner, self).setup_test_environment(**kwargs)
+
+        self._caches = override_settings(CACHES=TEST_CACHES)
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+
+        super(TestRunner, self).teardown_test_environment(**kwargs)
+
+    def get_resultclass(self):
+        base = (super(TestRunner, self).get_resultclass() or
+                unittest.TextTestResult)
+
+        return type('TestResult', (_ClearCachesMixin, base), {})
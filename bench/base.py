@@ -0,0 +1,150 @@
+#  bench/base.py: Shared sub-routines for performance benchmarks
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Shared sub-routines and initialization code for performance benchmarks.
+Benchmarks are run from the project root as modules, i.e.
+"python -m bench.running_out", against a throw away test database.
+
+"""
+
+import datetime
+import os
+import random
+import time
+
+import django
+
+
+def setup(db_name=None):
+    """
+    Initialize Django and create the test database.
+    An in-memory database is used unless db_name (file path) is given.
+    Return the original database name, to be passed in to teardown().
+
+    """
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    django.setup()
+
+    from django.conf import settings
+    from django.db import connection
+
+    if db_name is not None:
+        settings.DATABASES['default']['TEST'] = {'NAME': db_name}
+
+    old_name = settings.DATABASES['default']['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    return old_name
+
+
+def teardown(old_name):
+    """ Destroy the test database created by setup() """
+
+    from django.db import connection
+
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def populate(items, purchases, seed=0):
+    """
+    Fill the database with given number of items and purchases (spread evenly
+    across items) with raw inserts, and build the stock state for them.
+
+    """
+
+    from django.db import connection, transaction
+    from data.models.stock import StockState
+
+    rnd = random.Random(seed)
+    today = datetime.date.today()
+    per_item = max(1, purchases // items)
+
+    with transaction.atomic():
+        cursor = connection.cursor()
+
+        cursor.executemany(
+            """
+            insert into sopin_item
+                (id, name, unit_symbol, unit_weight, purchase_threshold,
+                 extended_threshold, heavy)
+            values
+                (%s, %s, '', 1, %s, 0, 0)
+            """,
+            [(i, 'Item #%06d' % i, rnd.randint(7, 60))
+             for i in range(1, items + 1)])
+
+        cursor.execute('select id, purchase_threshold from sopin_item')
+        for i, threshold in cursor.fetchall():
+            # Latest purchase is spread over the stock cycle of the item, so
+            # only a realistic fraction of items are running out.
+            quantity = rnd.randint(1, 3)
+            date = today - datetime.timedelta(
+                rnd.randint(0, threshold * quantity))
+            rows = []
+
+            for _ in range(per_item):
+                rows.append((i, date, quantity))
+                quantity = rnd.randint(1, 3)
+                date -= datetime.timedelta(threshold * quantity)
+
+            cursor.executemany(
+                """
+                insert into sopin_purchase (item_id, date, quantity)
+                values (%s, %s, %s)
+                """, rows)
+
+        StockState.objects.refresh()
+
+    cursor.execute('analyze')
+
+
+def measure(func, repeat=100):
+    """
+    Call func repeatedly and return (best, average) execution time of a
+    single call in milliseconds.
+
+    """
+
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return min(timings), sum(timings) / len(timings)
+
+
+def report(label, timing):
+    """ Print the result of measure() """
+
+    print('%-40s best %9.3f ms   avg %9.3f ms' % ((label, ) + timing))
+
+
+def query_plan(sql, params=None):
+    """ Print SQLite query plan of the given statement """
+
+    from django.db import connection
+
+    cursor = connection.cursor()
+    cursor.execute('explain query plan ' + sql, params or [])
+
+    for row in cursor.fetchall():
+        print('    ' + row[-1])
@@ -0,0 +1,157 @@
+#  bench/concurrency.py: Benchmark concurrent reads and writes
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Benchmark the throughput of processes reading the running out list while
+others record purchases in to the same SQLite database file, with the
+default rollback journal and with the SQLITE_PRAGMAS setting.
+
+    python -m bench.concurrency [--readers N] [--writers N] [--seconds N]
+
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from bench import base
+
+
+# Pragmas of a connection with out any tuning
+DEFAULT_PRAGMAS = (
+    ('journal_mode', 'delete'),
+    ('synchronous', 'full'),
+)
+
+
+def reader(seconds, results):
+    """ Read the running out list repeatedly for given number of seconds """
+
+    from django.db import OperationalError
+    from data.models.inventory import Item
+
+    count = errors = 0
+    end = time.time() + seconds
+
+    while time.time() < end:
+        try:
+            Item.objects.running_out(instances=False)
+            count += 1
+        except OperationalError:
+            errors += 1
+
+    results.put(('read', count, errors))
+
+
+def writer(seconds, items, results):
+    """ Record purchases repeatedly for given number of seconds """
+
+    from django.db import OperationalError
+    from data.models.inventory import Purchase
+
+    rnd = random.Random(os.getpid())
+    count = errors = 0
+    end = time.time() + seconds
+
+    while time.time() < end:
+        try:
+            Purchase.objects.create(item_id=rnd.randint(1, items))
+            count += 1
+        except OperationalError:
+            errors += 1
+
+    results.put(('write', count, errors))
+
+
+def run(label, args):
+    """ Run the reader and writer processes and report their throughput """
+
+    from django.db import connection
+
+    # Each process opens it's own connection with current settings
+    connection.close()
+
+    results = multiprocessing.Queue()
+    processes = (
+        [multiprocessing.Process(target=reader,
+                                 args=(args.seconds, results))
+         for _ in range(args.readers)] +
+        [multiprocessing.Process(target=writer,
+                                 args=(args.seconds, args.items, results))
+         for _ in range(args.writers)])
+
+    for p in processes:
+        p.start()
+
+    totals = {'read': [0, 0], 'write': [0, 0]}
+    for _ in processes:
+        kind, count, errors = results.get()
+        totals[kind][0] += count
+        totals[kind][1] += errors
+
+    for p in processes:
+        p.join()
+
+    print('%-20s reads %8.1f/s  writes %8.1f/s  errors %d' % (
+        label, totals['read'][0] / args.seconds,
+        totals['write'][0] / args.seconds,
+        totals['read'][1] + totals['write'][1]))
+
+
+def main():
+    """ Populate a database file and run the benchmark with both settings """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--purchases', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    old_name = base.setup(os.path.join(directory, 'bench.sqlite3'))
+
+    try:
+        from django.conf import settings
+
+        # Processes do not share a local memory cache, and should not touch
+        # the cache of the site
+        settings.CACHES['default'] = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+        print('Populating %d items and %d purchases...' %
+              (args.items, args.purchases))
+        base.populate(args.items, args.purchases)
+
+        tuned = settings.SQLITE_PRAGMAS
+
+        settings.SQLITE_PRAGMAS = DEFAULT_PRAGMAS
+        run('default journal', args)
+
+        settings.SQLITE_PRAGMAS = tuned
+        run('SQLITE_PRAGMAS', args)
+    finally:
+        base.teardown(old_name)
+
+
+if '__main__' == __name__:
+    main()
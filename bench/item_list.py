@@ -0,0 +1,81 @@
+#  bench/item_list.py: Benchmark rendering of the item list page
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Benchmark the item list request, served through the WSGI handler, with and
+with out the cached template loader and the per row fragment cache.
+
+    python -m bench.item_list [--items N] [--requests N]
+
+"""
+
+import argparse
+import copy
+
+from bench import base
+from bench.load import wsgi_get
+
+
+LOADERS = (
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+)
+
+CACHED_LOADERS = (('django.template.loaders.cached.Loader', LOADERS), )
+
+
+def main():
+    """ Populate the database and measure the item list in each mode """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    old_name = base.setup()
+
+    try:
+        from django.conf import settings
+        from django.core.handlers.wsgi import WSGIHandler
+        from django.test.utils import override_settings
+
+        print('Populating %d items...' % args.items)
+        base.populate(args.items, args.items * 10)
+
+        handler = WSGIHandler()
+        no_fragments = copy.deepcopy(settings.CACHES)
+        no_fragments['template_fragments'] = {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
+        for loaders, loader_label in ((LOADERS, 'template files'),
+                                      (CACHED_LOADERS, 'cached loader')):
+            for caches, cache_label in ((no_fragments, 'no row cache'),
+                                        (settings.CACHES, 'row cache')):
+                with override_settings(TEMPLATE_LOADERS=loaders,
+                                       CACHES=caches):
+                    path = '/item-maintenance/'
+                    wsgi_get(handler, path)
+                    base.report('%s, %s' % (loader_label, cache_label),
+                                base.measure(lambda: wsgi_get(handler, path),
+                                             args.requests))
+    finally:
+        base.teardown(old_name)
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,107 @@
+#  bench/load.py: Benchmark request latency with persistent connections
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Benchmark the latency of the homepage and item list requests, served through
+the WSGI handler the way mod_wsgi does, with the database connection closed
+after every request and kept open between requests (CONN_MAX_AGE).
+
+    python -m bench.load [--items N] [--purchases N] [--requests N]
+
+"""
+
+import argparse
+import io
+import os
+import tempfile
+
+from bench import base
+
+
+def wsgi_get(handler, path):
+    """ Make a GET request to the WSGI handler and read the response """
+
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+    result = handler(environ, lambda status, headers: None)
+
+    try:
+        for _ in result:
+            pass
+    finally:
+        # Fires request_finished, which closes non persistent connections
+        result.close()
+
+
+def main():
+    """ Populate a database file and measure the requests in both modes """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--purchases', type=int, default=50000)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    old_name = base.setup(os.path.join(directory, 'bench.sqlite3'))
+
+    try:
+        from django.conf import settings
+        from django.core.handlers.wsgi import WSGIHandler
+        from django.db import connection
+
+        settings.CACHES['default']['LOCATION'] = os.path.join(directory,
+                                                              'cache')
+        settings.ITEMS_PAGE_SIZE = 50
+
+        print('Populating %d items and %d purchases...' %
+              (args.items, args.purchases))
+        base.populate(args.items, args.purchases)
+
+        handler = WSGIHandler()
+
+        for max_age in (0, 600):
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+
+            for label, path in (('homepage', '/'),
+                                ('item list', '/item-maintenance/')):
+                wsgi_get(handler, path)
+                base.report('%s, CONN_MAX_AGE=%d' % (label, max_age),
+                            base.measure(lambda: wsgi_get(handler, path),
+                                         args.requests))
+    finally:
+        base.teardown(old_name)
+
+
+if '__main__' == __name__:
+    main()
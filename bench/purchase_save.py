@@ -0,0 +1,89 @@
+#  bench/purchase_save.py: Benchmark recording of purchases
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Benchmark the number of purchases recorded per second by Purchase.save,
+compared to loading and re-saving the whole Item to reset it's extended
+threshold as it was done before.
+
+    python -m bench.purchase_save [--purchases N] [--db PATH]
+
+"""
+
+import argparse
+import time
+
+from bench import base
+
+
+def legacy_save(purchase):
+    """ Save a purchase the way Purchase.save used to """
+
+    from django.db import models
+
+    models.Model.save(purchase)
+
+    if 0 != purchase.item.extended_threshold:
+        purchase.item.extended_threshold = 0
+        purchase.item.save()
+
+
+def run(label, save, first_item, count):
+    """ Save count purchases of fresh items with given function """
+
+    from data.models.inventory import Purchase
+
+    start = time.perf_counter()
+
+    for item_id in range(first_item, first_item + count):
+        save(Purchase(item_id=item_id))
+
+    elapsed = time.perf_counter() - start
+
+    print('%-40s %9.1f purchases/s' % (label, count / elapsed))
+
+
+def main():
+    """ Populate the database and run the benchmarks """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--purchases', type=int, default=2000)
+    parser.add_argument('--db', default=None,
+                        help='database file (in-memory by default)')
+    args = parser.parse_args()
+
+    old_name = base.setup(args.db)
+
+    try:
+        from django.db import connection
+
+        base.populate(args.purchases * 2, args.purchases * 2)
+
+        # Every item needs it's threshold reset on the first purchase
+        connection.cursor().execute(
+            'update sopin_item set extended_threshold = 5')
+
+        run('load and save item (before)', legacy_save, 1, args.purchases)
+        run('conditional update (after)', lambda p: p.save(),
+            args.purchases + 1, args.purchases)
+    finally:
+        base.teardown(old_name)
+
+
+if '__main__' == __name__:
+    main()
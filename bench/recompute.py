@@ -0,0 +1,56 @@
+#  bench/recompute.py: Benchmark the nightly recompute of derived data
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Benchmark "manage.py recompute" against a large inventory.
+
+    python -m bench.recompute [--items N] [--purchases N] [--db PATH]
+
+"""
+
+import argparse
+
+from bench import base
+
+
+def main():
+    """ Populate the database and run the recompute command """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--purchases', type=int, default=1000000)
+    parser.add_argument('--db', default=None,
+                        help='database file (in-memory by default)')
+    args = parser.parse_args()
+
+    old_name = base.setup(args.db)
+
+    try:
+        from django.core.management import call_command
+
+        print('Populating %d items and %d purchases...' %
+              (args.items, args.purchases))
+        base.populate(args.items, args.purchases)
+
+        call_command('recompute')
+    finally:
+        base.teardown(old_name)
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,133 @@
+#  bench/running_out.py: Benchmark running out list and latest purchase lookup
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Benchmark the latest purchase lookup used by the stock state and the running
+out list against a large purchase history.
+
+    python -m bench.running_out [--items N] [--purchases N]
+
+"""
+
+import argparse
+import datetime
+import random
+
+from bench import base
+
+
+# Aggregate the running out list used to be calculated with, kept here for
+# comparison
+LEGACY_SQL = """
+    select
+        i.id,
+        ifnull(julianday('now') - julianday(max(p.date)), -1) as stock_days,
+        ifnull(p.quantity, 0)
+    from
+        sopin_item as i
+    left join sopin_purchase as p
+        on p.item_id = i.id
+    group by
+        i.id
+    having
+        stock_days = -1 or
+        ((i.purchase_threshold * p.quantity) + i.extended_threshold
+         - stock_days) < 7
+    """
+
+LATEST_SQL = """
+    select
+        id
+    from
+        sopin_purchase
+    where
+        item_id = %s
+    order by
+        date desc,
+        id desc
+    limit 1
+    """
+
+
+def main():
+    """ Populate the database and run the benchmarks """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--purchases', type=int, default=1000000)
+    args = parser.parse_args()
+
+    old_name = base.setup()
+
+    try:
+        from django.db import connection
+        from data.models.inventory import Item
+        from data.models.stock import StockState
+
+        print('Populating %d items and %d purchases...' %
+              (args.items, args.purchases))
+        base.populate(args.items, args.purchases)
+
+        cursor = connection.cursor()
+        rnd = random.Random(1)
+
+        def latest_purchase():
+            cursor.execute(LATEST_SQL, [rnd.randint(1, args.items)])
+            cursor.fetchall()
+
+        def refresh():
+            StockState.objects.refresh(rnd.randint(1, args.items))
+
+        def running_out_query():
+            cursor.execute(
+                """
+                select item_id from sopin_stock_state
+                where runout_date is null or runout_date <= %s
+                """, [datetime.date.today() + datetime.timedelta(7)])
+            cursor.fetchall()
+
+        print('Latest purchase of an item:')
+        base.query_plan(LATEST_SQL, [1])
+        print('Running out list:')
+        base.query_plan(
+            """
+            select item_id from sopin_stock_state
+            where runout_date is null or runout_date <= %s
+            """, [datetime.date.today()])
+        print()
+
+        base.report('latest purchase of an item',
+                    base.measure(latest_purchase, 10000))
+        base.report('stock state refresh of an item',
+                    base.measure(refresh, 1000))
+        base.report('running out query (%d rows)' % len(
+            Item.objects.running_out()), base.measure(running_out_query))
+        base.report('ItemManager.running_out()',
+                    base.measure(Item.objects.running_out, 10))
+        base.report('ItemManager.running_out(instances=False)',
+                    base.measure(lambda: Item.objects.running_out(
+                        instances=False), 10))
+        base.report('legacy group by aggregate',
+                    base.measure(lambda: cursor.execute(LEGACY_SQL)
+                                 .fetchall(), 3))
+    finally:
+        base.teardown(old_name)
+
+
+if '__main__' == __name__:
+    main()
@@ -22,3 +22,10 @@ Initialize data pp by importing model classed separated in to sub-directories.
 """
 
 from .models.inventory import *
+from .models.stock import *
+from .models.revision import *
+from .models.rollup import *
+from .models.forecast import *
+
+# Connection set up and health check hooks
+from . import pragmas, health
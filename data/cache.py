@@ -0,0 +1,100 @@
+#  data/cache.py: Versioning of cached data derived from the inventory
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Versioning of cached data derived from the inventory.
+Cache keys include the current version of the data they depend on, and the
+version is replaced by a new random value when that data changes. Random
+values (instead of a counter) make sure a version evicted from the cache is
+never re-issued while entries cached under it still exist.
+Changes made in a transaction should issue their versions once it commits,
+see deferred_versions().
+
+"""
+
+import contextlib
+import threading
+import uuid
+
+from django.core.cache import cache
+
+
+KEY_PREFIX = 'sopin:'
+
+# Names of the versions held by deferred_versions() in this thread
+_deferred = threading.local()
+
+
+def get_version(name):
+    """ Return the current version of named data, issuing one if missing """
+
+    key = KEY_PREFIX + 'version:' + name
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key, '')
+
+    return version
+
+
+def bump_version(name):
+    """
+    Issue a new version of named data, invalidating what is cached, or hold
+    it until the enclosing deferred_versions() block exits.
+
+    """
+
+    names = getattr(_deferred, 'names', None)
+
+    if names is not None:
+        names.add(name)
+    else:
+        cache.set(KEY_PREFIX + 'version:' + name, uuid.uuid4().hex, None)
+
+
+@contextlib.contextmanager
+def deferred_versions():
+    """
+    Hold the versions bumped in the block, and issue them when the outermost
+    block exits.
+    Wrapped around a transaction, other threads and processes can not cache
+    what they read from the data before the change under the new version,
+    while the change is not committed yet.
+
+    """
+
+    if getattr(_deferred, 'names', None) is not None:
+        yield
+        return
+
+    _deferred.names = set()
+
+    try:
+        yield
+    finally:
+        names, _deferred.names = _deferred.names, None
+
+        for name in names:
+            bump_version(name)
+
+
+def make_key(name, *args):
+    """ Return cache key of named data, for the given arguments """
+
+    return KEY_PREFIX + ':'.join([name] + [str(a) for a in args])
@@ -0,0 +1,98 @@
+#  data/export.py: Text serialization of the inventory lists
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Text serialization of the inventory lists.
+Each function takes an iterable of STOCK_STATE_COLUMNS rows and yields the
+out put in pieces, so lists of any size can be streamed with out being held
+in memory.
+
+"""
+
+import collections
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models.inventory import STOCK_STATE_COLUMNS
+
+
+NAME = STOCK_STATE_COLUMNS.index('name')
+
+# Columns of the CSV out put
+CSV_COLUMNS = ('name', 'unit_weight', 'unit_symbol', 'stock_age',
+               'runout_date')
+
+
+class _Echo(object):  # pylint: disable=I0011,R0903
+    """ File like object that returns what is written to it """
+
+    @staticmethod
+    def write(value):
+        """ Return the value instead of storing it """
+
+        return value
+
+
+def text(rows):
+    """ Yield a "[] name" line per row """
+
+    for row in rows:
+        yield '[] %s\n' % row[NAME]
+
+
+def markdown(rows):
+    """ Yield a Markdown check list item per row """
+
+    for row in rows:
+        yield '- [ ] %s\n' % row[NAME]
+
+
+def csv_rows(rows):
+    """ Yield a header line and a CSV line per row """
+
+    writer = csv.writer(_Echo())
+    columns = [STOCK_STATE_COLUMNS.index(c) for c in CSV_COLUMNS]
+
+    yield writer.writerow(CSV_COLUMNS)
+
+    for row in rows:
+        yield writer.writerow([row[c] for c in columns])
+
+
+def json_array(rows):
+    """ Yield a JSON array with an object per row """
+
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    separator = '['
+
+    for row in rows:
+        yield separator + encoder.encode(
+            collections.OrderedDict(zip(STOCK_STATE_COLUMNS, row)))
+        separator = ','
+
+    yield '[]' if '[' == separator else ']'
+
+
+# Supported out put formats; (serializer, content type, file name extension)
+FORMATS = {
+    'txt': (text, 'text/plain; charset=utf-8', 'txt'),
+    'csv': (csv_rows, 'text/csv; charset=utf-8', 'csv'),
+    'json': (json_array, 'application/json', 'json'),
+    'md': (markdown, 'text/markdown; charset=utf-8', 'md'),
+}
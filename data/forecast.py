@@ -0,0 +1,93 @@
+#  data/forecast.py: Consumption rate forecasting of the inventory items
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Consumption rate forecasting of the inventory items.
+Rate of an item is the number of days a unit of it lasts, estimated from the
+interval between each purchase and the next divided by the quantity bought,
+as an exponentially weighted average that favors the recent purchases.
+All the items are estimated together with NumPy array operations.
+
+"""
+
+import numpy
+
+
+# Weight of the most recent interval in the average
+ALPHA = 0.5
+
+# Least number of intervals an item needs for it's rate to be estimated
+MIN_SAMPLES = 2
+
+
+def consumption_rates(items, days, quantities, alpha=ALPHA,
+                      min_samples=MIN_SAMPLES):
+    """
+    Estimate the consumption rate of items from their purchase history, given
+    as arrays of item ID, day number and quantity of each purchase, sorted by
+    item and day.
+    Purchases of an item on the same day are taken as one.
+    Return arrays of item IDs, days per unit and number of intervals used,
+    for the items with at least min_samples intervals.
+
+    """
+
+    items = numpy.asarray(items, dtype=numpy.int64)
+    days = numpy.asarray(days, dtype=numpy.float64)
+    quantities = numpy.asarray(quantities, dtype=numpy.float64)
+
+    if 2 > len(items):
+        return (numpy.empty(0, numpy.int64), numpy.empty(0),
+                numpy.empty(0, numpy.int64))
+
+    # Merge purchases of the same item and day
+    starts = numpy.flatnonzero(numpy.concatenate((
+        [True], (items[1:] != items[:-1]) | (days[1:] != days[:-1]))))
+    items = items[starts]
+    days = days[starts]
+    quantities = numpy.add.reduceat(quantities, starts)
+
+    # Days each purchase lasted, per unit bought
+    valid = (items[1:] == items[:-1]) & (0 < quantities[:-1])
+    samples = ((days[1:] - days[:-1]) / numpy.where(
+        0 < quantities[:-1], quantities[:-1], 1))[valid]
+    sample_items = items[1:][valid]
+
+    if 1 > len(samples):
+        return (numpy.empty(0, numpy.int64), numpy.empty(0),
+                numpy.empty(0, numpy.int64))
+
+    # Position of each sample from the most recent one of it's item, to
+    # weight them by (1 - alpha) ** age; the oldest sample takes the
+    # remaining weight so the weights of each item add up to 1
+    rate_items, group, counts = numpy.unique(
+        sample_items, return_inverse=True, return_counts=True)
+    first = numpy.cumsum(counts) - counts
+    position = numpy.arange(len(samples)) - first[group]
+    age = counts[group] - 1 - position
+
+    weights = alpha * (1 - alpha) ** age
+    oldest = 0 == position
+    weights[oldest] = (1 - alpha) ** age[oldest]
+
+    rates = (numpy.bincount(group, weights * samples) /
+             numpy.bincount(group, weights))
+
+    enough = min_samples <= counts
+
+    return rate_items[enough], rates[enough], counts[enough]
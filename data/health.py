@@ -0,0 +1,86 @@
+#  data/health.py: Health check of persistent database connections
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Health check of persistent database connections.
+Connections kept open between requests (CONN_MAX_AGE) are checked at the
+start of each request when DB_HEALTH_CHECKS setting is True, and closed to be
+re-opened on first use if they are broken, or if the SQLite database file was
+replaced (i.e. restored from a backup) since they were opened.
+
+"""
+
+import os
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def _file_id(connection):
+    """
+    Return the device and inode of the SQLite database file of given
+    connection, or None for in-memory or missing databases.
+
+    """
+
+    try:
+        stat = os.stat(connection.settings_dict['NAME'])
+    except (OSError, TypeError, ValueError):
+        return None
+
+    return stat.st_dev, stat.st_ino
+
+
+def is_healthy(connection):
+    """ Return True if given open connection can still be used """
+
+    if 'sqlite' != connection.vendor:
+        return connection.is_usable()
+
+    if getattr(connection, 'database_file_id', None) != _file_id(connection):
+        return False
+
+    try:
+        connection.connection.execute('select 1').fetchone()
+    except connection.Database.Error:
+        return False
+
+    return True
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    # pylint: disable=I0011,W0613
+    """ Remember the database file a new connection was opened on """
+
+    connection.database_file_id = _file_id(connection)
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):  # pylint: disable=I0011,W0613
+    """ Close the broken persistent connections at the start of request """
+
+    if not getattr(settings, 'DB_HEALTH_CHECKS', False):
+        return
+
+    for connection in connections.all():
+        if connection.connection is not None and not is_healthy(connection):
+            connection.close()
@@ -0,0 +1,60 @@
+#  data/management/commands/recompute.py: Nightly recompute of derived data
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Recompute the stock state and consumption rate forecast of all items.
+Meant to be run from cron shortly after midnight, so the running out list of
+the day is read from precomputed state:
+
+    5 0 * * *  /path/to/bin/python /path/to/src/manage.py recompute
+
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from data.models.forecast import Forecast
+from data.models.stock import StockState, CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    """ manage.py recompute [--chunk-size N] """
+
+    help = ('Recompute the stock state and consumption rate forecast of all '
+            'items for today.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='number of items to read at a time '
+                                 '(default: %d)' % CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        self.run('Stock state', StockState.objects.recompute,
+                 options['chunk_size'])
+        self.run('Forecast', Forecast.objects.refresh)
+
+    def run(self, label, func, *args):
+        """ Call func and report the items it processed per second """
+
+        start = time.time()
+        count = func(*args)
+        elapsed = time.time() - start
+
+        self.stdout.write('%s: %d items in %.2f s (%.0f items/s)' % (
+            label, count, elapsed, count / elapsed if elapsed else 0))
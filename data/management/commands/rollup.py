@@ -0,0 +1,56 @@
+#  data/management/commands/rollup.py: Rebuild and archive purchase rollups
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Rebuild the monthly purchase rollups and archive old purchases """
+
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from app.settings import PURCHASE_RETENTION_DAYS
+
+from data.models.rollup import PurchaseRollup
+
+
+class Command(BaseCommand):
+    """ manage.py rollup [--archive] [--days N] """
+
+    help = ('Recalculate the monthly purchase rollups of all items, and '
+            'optionally archive the purchases older than the retention '
+            'period.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive', action='store_true', default=False,
+                            help='move old purchases in to the archive')
+        parser.add_argument('--days', type=int,
+                            default=PURCHASE_RETENTION_DAYS,
+                            help='retention period of purchases in days '
+                                 '(default: %d)' % PURCHASE_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        PurchaseRollup.objects.refresh()
+
+        self.stdout.write('Rolled up %d item months' %
+                          PurchaseRollup.objects.count())
+
+        if options['archive']:
+            before = datetime.date.today() - datetime.timedelta(
+                days=options['days'])
+
+            self.stdout.write('Archived %d purchases made before %s' % (
+                PurchaseRollup.objects.archive(before), before))
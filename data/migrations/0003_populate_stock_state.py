@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import DataMigration
+from django.db import models
+
+
+class Migration(DataMigration):
+
+    def forwards(self, orm):
+        "Populate stock state of the existing items from their latest purchase."
+        db.execute("""
+            insert into sopin_stock_state
+                (item_id, last_purchase_date, last_quantity, threshold,
+                 runout_date)
+            select
+                i.id,
+                p.date,
+                ifnull(p.quantity, 0),
+                (i.purchase_threshold * ifnull(p.quantity, 0))
+                    + i.extended_threshold,
+                date(p.date, '+' || cast(
+                    (i.purchase_threshold * p.quantity)
+                    + i.extended_threshold as integer) || ' days')
+            from
+                sopin_item as i
+            left join sopin_purchase as p
+                on p.id = (
+                    select id from sopin_purchase
+                    where item_id = i.id
+                    order by date desc, id desc
+                    limit 1
+                )
+            """)
+
+    def backwards(self, orm):
+        "Stock state is removed along with it's table."
+        db.execute("delete from sopin_stock_state")
+
+    models = {
+        'data.item': {
+            'Meta': {'object_name': 'Item', 'db_table': "'sopin_item'", 'ordering': "['name']"},
+            'extended_threshold': ('django.db.models.fields.IntegerField', [], {'blank': 'True', 'default': '0'}),
+            'heavy': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '32', 'unique': 'True'}),
+            'purchase_threshold': ('django.db.models.fields.IntegerField', [], {'default': '21'}),
+            'unit_symbol': ('django.db.models.fields.CharField', [], {'max_length': '8', 'blank': 'True'}),
+            'unit_weight': ('django.db.models.fields.DecimalField', [], {'decimal_places': '2', 'default': '1', 'max_digits': '6'})
+        },
+        'data.purchase': {
+            'Meta': {'object_name': 'Purchase', 'db_table': "'sopin_purchase'", 'ordering': "['-date']"},
+            'date': ('django.db.models.fields.DateField', [], {'db_index': 'True', 'default': 'datetime.datetime(2014, 5, 31, 0, 0)'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'item': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['data.Item']"}),
+            'quantity': ('django.db.models.fields.DecimalField', [], {'decimal_places': '2', 'default': '1', 'max_digits': '6'})
+        },
+        'data.stockstate': {
+            'Meta': {'object_name': 'StockState', 'db_table': "'sopin_stock_state'"},
+            'item': ('django.db.models.fields.related.OneToOneField', [], {'related_name': "'stock_state'", 'unique': 'True', 'primary_key': 'True', 'to': "orm['data.Item']"}),
+            'last_purchase_date': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            'last_quantity': ('django.db.models.fields.DecimalField', [], {'decimal_places': '2', 'default': '0', 'max_digits': '6'}),
+            'runout_date': ('django.db.models.fields.DateField', [], {'db_index': 'True', 'null': 'True'}),
+            'threshold': ('django.db.models.fields.FloatField', [], {'default': '0'})
+        }
+    }
+
+    complete_apps = ['data']
+    symmetrical = True
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import DataMigration
+from django.db import models
+
+
+class Migration(DataMigration):
+
+    def forwards(self, orm):
+        "Populate monthly purchase rollups from the existing purchases."
+        db.execute("""
+            insert into sopin_purchase_rollup
+                (item_id, month, count, quantity, first_date, last_date,
+                 archived_count, archived_quantity)
+            select
+                item_id,
+                strftime('%Y-%m-01', date) as month,
+                count(*),
+                sum(quantity),
+                min(date),
+                max(date),
+                0,
+                0
+            from
+                sopin_purchase
+            group by
+                item_id,
+                month
+            """)
+
+    def backwards(self, orm):
+        "Rollups are removed along with their table."
+        db.execute("delete from sopin_purchase_rollup")
+
+    models = {
+        'data.item': {
+            'Meta': {'object_name': 'Item', 'db_table': "'sopin_item'", 'ordering': "['name']"},
+            'extended_threshold': ('django.db.models.fields.IntegerField', [], {'blank': 'True', 'default': '0'}),
+            'heavy': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '32', 'unique': 'True'}),
+            'purchase_threshold': ('django.db.models.fields.IntegerField', [], {'default': '21'}),
+            'unit_symbol': ('django.db.models.fields.CharField', [], {'max_length': '8', 'blank': 'True'}),
+            'unit_weight': ('django.db.models.fields.DecimalField', [], {'decimal_places': '2', 'default': '1', 'max_digits': '6'})
+        },
+        'data.purchase': {
+            'Meta': {'ordering': "['-date', '-id']", 'object_name': 'Purchase', 'index_together': "[['item', 'date']]", 'db_table': "'sopin_purchase'"},
+            'date': ('django.db.models.fields.DateField', [], {'db_index': 'True', 'default': 'datetime.datetime(2014, 5, 31, 0, 0)'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'item': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['data.Item']"}),
+            'quantity': ('django.db.models.fields.DecimalField', [], {'decimal_places': '2', 'default': '1', 'max_digits': '6'})
+        },
+        'data.purchasearchive': {
+            'Meta': {'object_name': 'PurchaseArchive', 'index_together': "[['item', 'month']]", 'db_table': "'sopin_purchase_archive'"},
+            'data': ('django.db.models.fields.BinaryField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'item': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'archives'", 'to': "orm['data.Item']"}),
+            'month': ('django.db.models.fields.DateField', [], {})
+        },
+        'data.purchaserollup': {
+            'Meta': {'ordering': "['-month', 'item']", 'unique_together': "[['item', 'month']]", 'object_name': 'PurchaseRollup', 'db_table': "'sopin_purchase_rollup'"},
+            'archived_count': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'archived_first_date': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            'archived_last_date': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            'archived_quantity': ('django.db.models.fields.DecimalField', [], {'decimal_places': '2', 'default': '0', 'max_digits': '10'}),
+            'count': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'first_date': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'item': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'rollups'", 'to': "orm['data.Item']"}),
+            'last_date': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            'month': ('django.db.models.fields.DateField', [], {}),
+            'quantity': ('django.db.models.fields.DecimalField', [], {'decimal_places': '2', 'default': '0', 'max_digits': '10'})
+        },
+        'data.revision': {
+            'Meta': {'object_name': 'Revision', 'db_table': "'sopin_revision'"},
+            'modified': ('django.db.models.fields.DateTimeField', [], {}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '32', 'primary_key': 'True'})
+        },
+        'data.stockstate': {
+            'Meta': {'object_name': 'StockState', 'db_table': "'sopin_stock_state'"},
+            'item': ('django.db.models.fields.related.OneToOneField', [], {'related_name': "'stock_state'", 'unique': 'True', 'primary_key': 'True', 'to': "orm['data.Item']"}),
+            'last_purchase_date': ('django.db.models.fields.DateField', [], {'null': 'True'}),
+            'last_quantity': ('django.db.models.fields.DecimalField', [], {'decimal_places': '2', 'default': '0', 'max_digits': '6'}),
+            'runout_date': ('django.db.models.fields.DateField', [], {'db_index': 'True', 'null': 'True'}),
+            'threshold': ('django.db.models.fields.FloatField', [], {'default': '0'})
+        }
+    }
+
+    complete_apps = ['data']
+    symmetrical = True
@@ -0,0 +1,115 @@
+#  data/models/forecast.py: Consumption rate forecast of the inventory items
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Consumption rate forecast of the inventory items """
+
+import itertools
+
+import numpy
+
+from django.db import models, connection, transaction
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
+
+from ..cache import deferred_versions
+from ..forecast import consumption_rates
+from .inventory import Item
+from .revision import Revision
+
+
+class ForecastManager(models.Manager):
+    """ Model manager for Forecast """
+
+    def refresh(self):
+        """
+        Estimate the consumption rate of all the items from their purchase
+        history in a single batch, and replace the stored forecasts with them.
+        Purchases moved to the archive are not part of the history.
+        Return the number of items forecast.
+
+        """
+
+        cursor = connection.cursor()
+        cursor.execute(
+            """
+            select
+                item_id,
+                julianday(date),
+                cast(quantity as real)
+            from
+                sopin_purchase
+            order by
+                item_id,
+                date,
+                id
+            """)
+
+        # Rows are copied in to arrays as they are read, with out building
+        # any intermediate objects
+        chunks = [numpy.empty(0)]
+        while True:
+            rows = cursor.fetchmany(GET_ITERATOR_CHUNK_SIZE * 100)
+
+            if not rows:
+                break
+
+            chunks.append(numpy.fromiter(itertools.chain.from_iterable(rows),
+                                         numpy.float64, 3 * len(rows)))
+
+        history = numpy.concatenate(chunks).reshape(-1, 3)
+        items, rates, samples = consumption_rates(
+            history[:, 0], history[:, 1], history[:, 2])
+
+        # Cached data is invalidated only after the forecasts are committed
+        with deferred_versions(), transaction.atomic():
+            cursor.execute('delete from sopin_forecast')
+            cursor.executemany(
+                """
+                insert into sopin_forecast
+                    (item_id, days_per_unit, samples)
+                values
+                    (%s, %s, %s)
+                """,
+                list(zip(items.tolist(), rates.tolist(), samples.tolist())))
+
+            Revision.objects.touch('forecast')
+
+        return len(items)
+
+
+class Forecast(models.Model):
+    """
+    Forecast data model definition.
+    Estimated number of days a unit of an Item lasts, for the items with
+    enough purchase history. Run out date of an item is forecast from it's
+    stock state with this rate, in place of the purchase threshold.
+
+    """
+
+    objects = ForecastManager()
+
+    item = models.OneToOneField(Item, primary_key=True,
+                                related_name='forecast')
+    days_per_unit = models.FloatField()
+    samples = models.IntegerField()
+
+    class Meta:  # pylint: disable=I0011,C1001
+        """ Meta class for Forecast model """
+
+        # Set following fields manually since our models are in sub-directories
+        app_label = 'data'
+        db_table = 'sopin_forecast'
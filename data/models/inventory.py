@@ -20,22 +20,226 @@
 
 import datetime
 
-from django.db import models, connection
+from django.core.cache import cache
+from django.db import models, connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
+from django.dispatch import receiver, Signal
+from django.utils.dateparse import parse_date
+
+from ..cache import get_version, bump_version, deferred_versions, make_key
 
 
 RUNOUT_DAYS = 7
 
+# Values of the rows yielded by the stock state queries of ItemManager
+STOCK_STATE_COLUMNS = ('id', 'name', 'unit_symbol', 'unit_weight',
+                       'purchase_threshold', 'extended_threshold', 'heavy',
+                       'stock_age', 'stock_age_percent', 'runout_date')
+
+# Sent with the IDs of purchased items and the purchases when purchases are
+# created in bulk, in place of the post_save signal of each purchase
+purchases_created = Signal(providing_args=['item_ids', 'purchases'])
+
+
+# Stock state with the threshold and run out date projected from the
+# consumption rate forecast (days per unit) of the items that have one
+FORECAST_STATE_SQL = """
+    (
+        select
+            s.item_id,
+            s.last_purchase_date,
+            ifnull(f.days_per_unit * s.last_quantity + i.extended_threshold,
+                   s.threshold) as threshold,
+            case
+                when f.item_id is null or s.last_purchase_date is null
+                    then s.runout_date
+                else date(s.last_purchase_date, '+' || cast(round(
+                    (f.days_per_unit * s.last_quantity + i.extended_threshold)
+                    * 86400) as integer) || ' seconds')
+            end as runout_date
+        from
+            sopin_stock_state as s
+        inner join sopin_item as i
+            on i.id = s.item_id
+        left join sopin_forecast as f
+            on f.item_id = s.item_id
+    )
+    """
+
+
+# Stock age in days and the stock threshold, for the stock age percentage to
+# be calculated from
+LIVE_AGE_SQL = """
+    ifnull(julianday('now') - julianday(s.last_purchase_date), -1)
+        as stock_days,
+    s.threshold
+    """
+
+# Stock age in days and it's percentage of the threshold, as stored in the
+# stock state by the last recompute
+PRECOMPUTED_AGE_SQL = """
+    s.stock_age as stock_days,
+    s.stock_age_percent
+    """
+
+
+class StockRow(object):
+    """
+    Read only stock state of an item, with the same attributes as the Items
+    returned by ItemManager.running_out.
+    Used for the lists that are only displayed, skipping the cost of model
+    instantiation.
+
+    """
+
+    __slots__ = STOCK_STATE_COLUMNS
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @property
+    def pk(self):
+        """ Same as Item.pk """
+
+        return self.id  # pylint: disable=I0011,E1101
+
+    def __eq__(self, other):
+        return (type(self) == type(other) and
+                all(getattr(self, n) == getattr(other, n)
+                    for n in self.__slots__))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.id)  # pylint: disable=I0011,E1101
+
+    def __repr__(self):
+        return '<StockRow: %s>' % self.name  # pylint: disable=I0011,E1101
+
 
 class ItemManager(models.Manager):
     """ Model manager for Items """
 
-    def running_out(self):
+    def with_last_purchase(self):
+        """
+        Return all Items along with their stock state, so the latest purchase
+        date and quantity of each item are fetched in a single query.
+
+        """
+
+        return self.select_related('stock_state')
+
+    def running_out(self, days=RUNOUT_DAYS, instances=True, forecast=False,
+                    precomputed=False):
+        """
+        Return a list of Items that needs to be purchased with in given number
+        of days (RUNOUT_DAYS by default), including the items that were never
+        purchased.
+        When instances is False, the list is made of read only StockRow
+        objects instead, which are much cheaper to create than Item instances
+        for the callers that only display the list.
+        When forecast is True, run out dates are projected from the
+        consumption rate forecast of the items that have one.
+        When precomputed is True, stock age is read from the stock state as
+        of the day it was last recomputed, instead of being calculated from
+        the current time.
+
+        """
+
+        return self._stock_state(*self._running_out_query(days),
+                                 instances=instances, forecast=forecast,
+                                 precomputed=precomputed)
+
+    def running_out_rows(self, days=RUNOUT_DAYS, forecast=False,
+                         precomputed=False):
+        """
+        Same as running_out, but yield plain tuples of STOCK_STATE_COLUMNS
+        values as they are read from the database.
+
+        """
+
+        return self._stock_state_rows(*self._running_out_query(days),
+                                      forecast=forecast,
+                                      precomputed=precomputed)
+
+    def running_out_between(self, start, end, instances=True):
+        """
+        Return a list of Items (or StockRow objects when instances is False)
+        that are projected to run out between start and end dates
+        (inclusive), in the order of their run out date.
+
+        """
+
+        return self._stock_state('s.runout_date between %s and %s',
+                                 [start, end], 's.runout_date asc',
+                                 instances=instances)
+
+    def stock_state_rows(self, precomputed=False):
+        """
+        Yield tuples of STOCK_STATE_COLUMNS values of all the items, in the
+        order of their name.
+
+        """
+
+        return self._stock_state_rows(None, [], 'i.name asc',
+                                      precomputed=precomputed)
+
+    @staticmethod
+    def _running_out_query(days):
+        """ Return the condition, parameters and order of running out list """
+
+        limit = datetime.date.today() + datetime.timedelta(days=days)
+
+        return ('s.runout_date is null or s.runout_date <= %s', [limit],
+                'stock_days asc')
+
+    def _stock_state(self, condition, params, order, instances=True,
+                     forecast=False, precomputed=False):
         """
-        Return a list of Items that needs to be purchased with in RUNOUT_DAYS
-        days.
+        Return a list of Items selected from the stock state by the given
+        condition, with stock_age, stock_age_percent and runout_date set.
+        When instances is False, return StockRow objects instead.
 
         """
 
+        rows = self._stock_state_rows(condition, params, order, forecast,
+                                      precomputed)
+
+        if not instances:
+            return [StockRow(*i) for i in rows]
+
+        result = []
+        for i in rows:
+            item = self.model(pk=i[0], name=i[1], unit_symbol=i[2],
+                              unit_weight=i[3], purchase_threshold=i[4],
+                              extended_threshold=i[5], heavy=i[6])
+            item.stock_age = i[7]
+            item.stock_age_percent = i[8]
+            item.runout_date = i[9]
+
+            result.append(item)
+
+        return result
+
+    @staticmethod
+    def _stock_state_rows(condition, params, order, forecast=False,
+                          precomputed=False):
+        """
+        Yield tuples of STOCK_STATE_COLUMNS values selected from the stock
+        state by the given condition (all items when None), fetching them from
+        the cursor in chunks.
+        When forecast is True, the threshold and run out date of the stock
+        state are replaced with the ones projected from the forecast.
+        When precomputed is True (and forecast is not), stock age is read as
+        stored in the stock state.
+
+        """
+
+        precomputed = precomputed and not forecast
+
         cursor = connection.cursor()
         cursor.execute(
             """
@@ -47,42 +251,43 @@ class ItemManager(models.Manager):
                 i.purchase_threshold,
                 i.extended_threshold,
                 i.heavy,
-                ifnull(julianday('now') - julianday(max(p.date)), -1)
-                    as stock_days,
-                ifnull(p.quantity, 0)
+                """ + (PRECOMPUTED_AGE_SQL if precomputed else
+                       LIVE_AGE_SQL) + """,
+                s.runout_date
             from
-                sopin_item as i
-            left join sopin_purchase as p
-                on p.item_id = i.id
-            group by
-                i.id
-            having
-                stock_days = -1 or
-                (
-                    (i.purchase_threshold * p.quantity)
-                    + i.extended_threshold
-                    - stock_days
-                ) < %d
+                """ + (FORECAST_STATE_SQL if forecast else
+                       'sopin_stock_state') + """ as s
+            inner join sopin_item as i
+                on i.id = s.item_id
+            """ + ('where ' + condition if condition else '') + """
             order by
-                stock_days asc
-            """ % RUNOUT_DAYS)
+                """ + order, params)
 
-        result = []
-        for i in cursor.fetchall():
-            item = self.model(pk=i[0], name=i[1], unit_symbol=i[2],
-                              unit_weight=i[3], purchase_threshold=i[4],
-                              extended_threshold=i[5], heavy=i[6])
-            item.stock_age = i[7]
+        while True:
+            rows = cursor.fetchmany(GET_ITERATOR_CHUNK_SIZE)
 
-            age = i[7]
-            th = (i[4] * i[8]) + i[5]
+            if not rows:
+                break
 
-            if 0 < age and age < th:
-                item.stock_age_percent = age / th * 100
+            for i in rows:
+                if precomputed:
+                    yield i
+                    continue
 
-            result.append(item)
+                age = i[7]
+                th = i[8]
+                percent = 0
 
-        return result
+                if 0 < age and age < th:
+                    percent = age / th * 100
+
+                runout = i[9]
+
+                # Dates calculated by the forecast are read as text
+                if isinstance(runout, str):
+                    runout = parse_date(runout)
+
+                yield i[:8] + (percent, runout)
 
 
 class Item(models.Model):
@@ -101,15 +306,66 @@ class Item(models.Model):
 
     stock_age = None
     stock_age_percent = 0
+    runout_date = None
 
     def last_purchase(self):
-        """ Return the most recent Purchase for this item """
+        """
+        Return the most recent Purchase for this item.
+        Result is kept on the instance, and in the cache until the purchases of
+        this item change.
 
-        try:
-            return Purchase.objects.filter(item__id=self.id)[0]
-        except IndexError:
+        """
+
+        if self.id is None:
             return None
 
+        if not hasattr(self, '_last_purchase'):
+            key = make_key('last_purchase', self.id,
+                           get_version('purchase:%d' % self.id))
+            cached = cache.get(key)
+
+            if cached is None:
+                # Wrapped in a tuple to tell apart cached "None" from a miss
+                cached = (Purchase.objects.filter(item__id=self.id).first(), )
+                cache.set(key, cached, None)
+
+            self._last_purchase = cached[0]
+
+        return self._last_purchase
+
+    @property
+    def version(self):
+        """
+        Return a string that changes whenever the item or it's latest purchase
+        date changes, made from the values themselves, for keying what is
+        cached from them with out having to look up or invalidate anything.
+
+        """
+
+        state = getattr(self, 'stock_state', None)
+
+        return ':'.join(str(v) for v in (
+            self.name, self.unit_symbol, self.unit_weight,
+            self.purchase_threshold, self.extended_threshold, self.heavy,
+            state.last_purchase_date if state is not None else None))
+
+    def delete(self, *args, **kwargs):  # pylint: disable=I0011,E1002
+        """
+        Override parent "delete" method to remove the purchases of the item
+        with a single query, with out the signals of each purchase, since the
+        stock state and rollups derived from them are removed along with the
+        item. Cached data is invalidated only after the transaction is
+        committed.
+
+        """
+
+        with deferred_versions(), transaction.atomic():
+            connection.cursor().execute(
+                'delete from sopin_purchase where item_id = %s', [self.pk])
+            bump_version('purchase:%d' % self.pk)
+
+            super(Item, self).delete(*args, **kwargs)
+
     class Meta:  # pylint: disable=I0011,C1001
         """ Meta class for Item model """
 
@@ -120,27 +376,112 @@ class Item(models.Model):
         db_table = 'sopin_item'
 
 
+class PurchaseManager(models.Manager):
+    """ Model manager for Purchases """
+
+    def bulk_record(self, purchases):
+        """
+        Save given list of new Purchases with a single insert, and reset the
+        extended threshold of purchased items with a single update, in one
+        transaction.
+
+        """
+
+        item_ids = sorted(set(p.item_id for p in purchases))
+
+        # Cached data is invalidated only after the purchases are committed
+        with deferred_versions(), transaction.atomic():
+            self.bulk_create(purchases)
+
+            Item.objects.filter(pk__in=item_ids).exclude(
+                extended_threshold=0).update(extended_threshold=0)
+
+            purchases_created.send(sender=self.model, item_ids=item_ids,
+                                   purchases=purchases)
+
+
 class Purchase(models.Model):
     """ Purchase data model definition """
 
+    objects = PurchaseManager()
+
     item = models.ForeignKey(Item)
     date = models.DateField(default=datetime.date.today(), db_index=True)
     quantity = models.DecimalField(max_digits=6, decimal_places=2, default=1)
 
     def save(self, *args, **kwargs):  # pylint: disable=I0011,E1002
-        """ Override parent "save" method to adjust Item parameters """
+        """
+        Override parent "save" method to reset the extended threshold of the
+        purchased Item.
+        Threshold is reset with a conditional update in the same transaction,
+        so the Item is neither loaded nor re-written in full. Cached data is
+        invalidated only after the transaction is committed.
+
+        """
+
+        with deferred_versions(), transaction.atomic():
+            reset = Item.objects.filter(pk=self.item_id).exclude(
+                extended_threshold=0).update(extended_threshold=0)
+
+            super(Purchase, self).save(*args, **kwargs)
+
+        # Keep the Item instance of this purchase (if already loaded) current
+        item = getattr(self, type(self).item.cache_name, None)
+        if item is not None:
+            item.__dict__.pop('_last_purchase', None)
+
+            if reset:
+                item.extended_threshold = 0
 
-        super(Purchase, self).save(*args, **kwargs)
+    def delete(self, *args, **kwargs):  # pylint: disable=I0011,E1002
+        """
+        Override parent "delete" method to invalidate cached data only after
+        the purchase is removed in a committed transaction.
+
+        """
 
-        if 0 != self.item.extended_threshold:
-            self.item.extended_threshold = 0
-            self.item.save()
+        with deferred_versions():
+            super(Purchase, self).delete(*args, **kwargs)
 
     class Meta:  # pylint: disable=I0011,C1001
         """ Meta class for Purchase model """
 
-        ordering = ['-date']
+        # Purchases made on the same date are ordered by their creation, so the
+        # "latest purchase" of an item is always the same record.
+        ordering = ['-date', '-id']
+        index_together = [['item', 'date']]
 
         # Set following fields manually since our models are in sub-directories
         app_label = 'data'
         db_table = 'sopin_purchase'
+
+
+@receiver(post_save, sender=Item)
+def item_created(sender, instance, created, **kwargs):
+    # pylint: disable=I0011,W0613
+    """
+    Item IDs can be re-used after removing the last item, make sure nothing
+    cached for a previous item is seen by the new one.
+
+    """
+
+    if created:
+        bump_version('purchase:%d' % instance.pk)
+
+
+@receiver(post_save, sender=Purchase)
+@receiver(post_delete, sender=Purchase)
+def purchase_changed(sender, instance, **kwargs):
+    # pylint: disable=I0011,W0613
+    """ Invalidate cached purchase information of the item """
+
+    bump_version('purchase:%d' % instance.item_id)
+
+
+@receiver(purchases_created, sender=Purchase)
+def purchases_bulk_created(sender, item_ids, **kwargs):
+    # pylint: disable=I0011,W0613
+    """ Invalidate cached purchase information of the items """
+
+    for item_id in item_ids:
+        bump_version('purchase:%d' % item_id)
@@ -0,0 +1,105 @@
+#  data/models/revision.py: Change tracking of the shopping inventory
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Change tracking of the shopping inventory """
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Max
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from ..cache import get_version, bump_version, make_key
+from .inventory import Item, Purchase, purchases_created
+
+
+class RevisionManager(models.Manager):
+    """ Model manager for Revision """
+
+    def touch(self, name):
+        """
+        Record the named data as modified now, and issue a new inventory
+        version.
+
+        """
+
+        now = timezone.now()
+
+        if 0 == self.filter(pk=name).update(modified=now):
+            self.create(name=name, modified=now)
+
+        bump_version('inventory')
+
+    def last_modified(self):
+        """
+        Return the time of the most recent change to the inventory, or None
+        if nothing was recorded yet.
+
+        """
+
+        key = make_key('last_modified', get_version('inventory'))
+        cached = cache.get(key)
+
+        if cached is None:
+            cached = (self.aggregate(Max('modified'))['modified__max'], )
+            cache.set(key, cached, None)
+
+        return cached[0]
+
+
+class Revision(models.Model):
+    """
+    Revision data model definition.
+    One record per tracked data model, holding the time it was last modified.
+
+    """
+
+    objects = RevisionManager()
+
+    name = models.CharField(max_length=32, primary_key=True)
+    modified = models.DateTimeField()
+
+    class Meta:  # pylint: disable=I0011,C1001
+        """ Meta class for Revision model """
+
+        # Set following fields manually since our models are in sub-directories
+        app_label = 'data'
+        db_table = 'sopin_revision'
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Purchase)
+@receiver(post_delete, sender=Purchase)
+def inventory_changed(sender, **kwargs):  # pylint: disable=I0011,W0613
+    """ Record the modification time of Items and Purchases """
+
+    Revision.objects.touch(sender._meta.model_name)
+
+
+@receiver(purchases_created, sender=Purchase)
+def purchases_bulk_created(sender, **kwargs):  # pylint: disable=I0011,W0613
+    """
+    Record the modification time of Purchases, and the Items which had their
+    thresholds reset.
+
+    """
+
+    Revision.objects.touch('purchase')
+    Revision.objects.touch('item')
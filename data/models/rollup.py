@@ -0,0 +1,517 @@
+#  data/models/rollup.py: Monthly rollup and archive of the purchase history
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Monthly rollup and archive of the purchase history """
+
+import collections
+import datetime
+import decimal
+import json
+import zlib
+
+from django.db import models, connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .inventory import Item, Purchase, purchases_created
+from .stock import CHUNK_SIZE
+
+
+def _chunks(item_ids):
+    """ Split given item IDs (or None for all items) in to query chunks """
+
+    if item_ids is None:
+        return [None]
+
+    if isinstance(item_ids, int):
+        item_ids = [item_ids]
+
+    item_ids = list(item_ids)
+
+    return [item_ids[n:n + CHUNK_SIZE]
+            for n in range(0, len(item_ids), CHUNK_SIZE)]
+
+
+def _in(column, item_ids):
+    """ Return the SQL condition and parameters to match given item IDs """
+
+    if item_ids is None:
+        return '1 = 1', []
+
+    return ('%s in (%s)' % (column, ', '.join(['%s'] * len(item_ids))),
+            list(item_ids))
+
+
+class PurchaseRollupManager(models.Manager):
+    """ Model manager for PurchaseRollup """
+
+    def refresh(self, item_ids=None, create=True):
+        """
+        Recalculate the monthly rollups of given item(s), or all the items
+        when item_ids is None, from their purchases and what was archived.
+        When create is False, only the existing rollup records will be
+        updated.
+
+        """
+
+        with transaction.atomic():
+            for chunk in _chunks(item_ids):
+                self._refresh(chunk, create)
+
+    def _refresh(self, item_ids, create):
+        """ Recalculate the monthly rollups of a chunk of items """
+
+        cursor = connection.cursor()
+        condition, params = _in('item_id', item_ids)
+
+        # Start from what was archived, and add the live purchases on top
+        cursor.execute(
+            """
+            update
+                sopin_purchase_rollup
+            set
+                count = archived_count,
+                quantity = archived_quantity,
+                first_date = archived_first_date,
+                last_date = archived_last_date
+            where
+                """ + condition, params)
+
+        cursor.execute(
+            """
+            select
+                item_id,
+                strftime('%%Y-%%m-01', date) as month,
+                count(*),
+                sum(quantity),
+                min(date),
+                max(date)
+            from
+                sopin_purchase
+            where
+                """ + condition + """
+            group by
+                item_id,
+                month
+            """, params)
+        months = cursor.fetchall()
+
+        if 0 < len(months):
+            cursor.executemany(
+                """
+                update
+                    sopin_purchase_rollup
+                set
+                    count = archived_count + %s,
+                    quantity = archived_quantity + %s,
+                    first_date = min(ifnull(archived_first_date, %s), %s),
+                    last_date = max(ifnull(archived_last_date, %s), %s)
+                where
+                    item_id = %s and
+                    month = %s
+                """,
+                [(m[2], m[3], m[4], m[4], m[5], m[5], m[0], m[1])
+                 for m in months])
+
+            if create and cursor.rowcount < len(months):
+                existing = set(
+                    (i, m.strftime('%Y-%m-%d')) for i, m in
+                    self.filter(item_id__in=set(m[0] for m in months))
+                    .values_list('item_id', 'month'))
+
+                self.bulk_create([
+                    self.model(item_id=m[0], month=m[1], count=m[2],
+                               quantity=m[3], first_date=m[4],
+                               last_date=m[5])
+                    for m in months if (m[0], m[1]) not in existing])
+
+        # Months with out any purchases left
+        cursor.execute(
+            'delete from sopin_purchase_rollup where count = 0 and ' +
+            condition, params)
+
+    def adjust(self, changes, create=True):
+        """
+        Add the (count, quantity) changes of given (item ID, month) pairs to
+        their rollups, negative to subtract, and recalculate the first and
+        last purchase dates of only those months. Rollups left with out any
+        purchases are removed.
+        When create is False, missing rollups are not created.
+
+        """
+
+        with transaction.atomic():
+            cursor = connection.cursor()
+            created = []
+
+            for (item_id, month), (count, quantity) in sorted(
+                    changes.items()):
+                month_params = [item_id, month, _next_month(month)]
+
+                cursor.execute(
+                    """
+                    select
+                        min(date),
+                        max(date)
+                    from
+                        sopin_purchase
+                    where
+                        item_id = %s and
+                        date >= %s and
+                        date < %s
+                    """, month_params)
+                first, last = cursor.fetchone()
+
+                cursor.execute(
+                    """
+                    update
+                        sopin_purchase_rollup
+                    set
+                        count = count + %s,
+                        quantity = quantity + %s,
+                        first_date = coalesce(min(archived_first_date, %s),
+                                              archived_first_date, %s),
+                        last_date = coalesce(max(archived_last_date, %s),
+                                             archived_last_date, %s)
+                    where
+                        item_id = %s and
+                        month = %s
+                    """, [count, quantity, first, first, last, last,
+                          item_id, month])
+
+                if 0 < cursor.rowcount:
+                    if 0 > count:
+                        cursor.execute(
+                            """
+                            delete from
+                                sopin_purchase_rollup
+                            where
+                                item_id = %s and
+                                month = %s and
+                                count < 1
+                            """, [item_id, month])
+
+                    continue
+
+                if not create or first is None:
+                    continue
+
+                # Rollup is missing, take the totals of the whole month
+                cursor.execute(
+                    """
+                    select
+                        count(*),
+                        sum(quantity)
+                    from
+                        sopin_purchase
+                    where
+                        item_id = %s and
+                        date >= %s and
+                        date < %s
+                    """, month_params)
+                total_count, total_quantity = cursor.fetchone()
+
+                created.append(self.model(
+                    item_id=item_id, month=month, count=total_count,
+                    quantity=total_quantity, first_date=_date(first),
+                    last_date=_date(last)))
+
+            self.bulk_create(created)
+
+    def for_month(self, month):
+        """
+        Return the rollups of the month given date falls in, along with their
+        items, in the order of item name.
+
+        """
+
+        return self.filter(month=_month(month)).select_related(
+            'item').order_by('item__name')
+
+    def totals(self, month):
+        """ Return the number of purchases and items of the month """
+
+        return self.filter(month=_month(month)).aggregate(
+            purchases=Sum('count'), items=Count('id'))
+
+    def adjacent_months(self, month):
+        """
+        Return the closest months before and after the month given date falls
+        in that has any purchases, or None in place of a month with out one.
+
+        """
+
+        month = _month(month)
+
+        return (self.filter(month__lt=month).aggregate(m=Max('month'))['m'],
+                self.filter(month__gt=month).aggregate(m=Min('month'))['m'])
+
+    def archive(self, before):
+        """
+        Move the purchases made before the given date out of the purchase
+        table, in to compressed PurchaseArchive records, and add them to the
+        archived totals of their monthly rollups.
+        Latest purchase of each item is always kept, since the stock state
+        depends on it.
+        Return the number of purchases archived.
+
+        """
+
+        with transaction.atomic():
+            cursor = connection.cursor()
+            cursor.execute(
+                """
+                select
+                    p.id,
+                    p.item_id,
+                    p.date,
+                    p.quantity
+                from
+                    sopin_purchase as p
+                where
+                    p.date < %s and
+                    p.id <> (
+                        select
+                            id
+                        from
+                            sopin_purchase
+                        where
+                            item_id = p.item_id
+                        order by
+                            date desc,
+                            id desc
+                        limit 1
+                    )
+                order by
+                    p.item_id,
+                    p.date,
+                    p.id
+                """, [before])
+            purchases = cursor.fetchall()
+
+            if 1 > len(purchases):
+                return 0
+
+            months = collections.OrderedDict()
+            for pid, item_id, date, quantity in purchases:
+                months.setdefault((item_id, _month(date)), []).append(
+                    (pid, date, quantity))
+
+            # Make sure every archived month has a rollup to add to
+            self.refresh(set(item_id for item_id, _ in months))
+
+            PurchaseArchive.objects.bulk_create([
+                PurchaseArchive(item_id=item_id, month=month,
+                                data=PurchaseArchive.compress(rows))
+                for (item_id, month), rows in months.items()])
+
+            cursor.executemany(
+                """
+                update
+                    sopin_purchase_rollup
+                set
+                    archived_count = archived_count + %s,
+                    archived_quantity = archived_quantity + %s,
+                    archived_first_date = min(
+                        ifnull(archived_first_date, %s), %s),
+                    archived_last_date = max(
+                        ifnull(archived_last_date, %s), %s)
+                where
+                    item_id = %s and
+                    month = %s
+                """,
+                [(len(rows), sum(r[2] for r in rows), rows[0][1], rows[0][1],
+                  rows[-1][1], rows[-1][1], item_id, month)
+                 for (item_id, month), rows in months.items()])
+
+            # Removed with out signals; totals of the rollups and the latest
+            # purchase of each item stay the same
+            ids = [p[0] for p in purchases]
+            for n in range(0, len(ids), CHUNK_SIZE):
+                chunk = ids[n:n + CHUNK_SIZE]
+                cursor.execute(
+                    'delete from sopin_purchase where id in (%s)' % (
+                        ', '.join(['%s'] * len(chunk)), ), chunk)
+
+        return len(purchases)
+
+
+def _date(value):
+    """ Return given date, or date read from a database row, as a date """
+
+    if isinstance(value, datetime.date):
+        return value
+
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _month(value):
+    """ Return the first day of the month of given date """
+
+    return _date(value).replace(day=1)
+
+
+def _next_month(month):
+    """ Return the first day of the month after the given month """
+
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def _changes(*purchases):
+    """
+    Return the rollup changes of given (item ID, date, count, quantity)
+    purchase rows, by (item ID, month).
+
+    """
+
+    changes = collections.OrderedDict()
+
+    for item_id, date, count, quantity in purchases:
+        key = (item_id, _month(date))
+        total_count, total_quantity = changes.get(key, (0, 0))
+        changes[key] = (total_count + count,
+                        total_quantity + decimal.Decimal(str(quantity)))
+
+    return changes
+
+
+class PurchaseRollup(models.Model):
+    """
+    Purchase rollup data model definition.
+    One record per Item and month it was purchased in, with the number of
+    purchases, total quantity and the first and last purchase dates of the
+    month. Totals include the purchases moved to the archive, which are also
+    kept separately in the archived_* fields.
+
+    """
+
+    objects = PurchaseRollupManager()
+
+    item = models.ForeignKey(Item, related_name='rollups')
+    month = models.DateField(db_index=True)
+    count = models.IntegerField(default=0)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2,
+                                   default=0)
+    first_date = models.DateField(null=True)
+    last_date = models.DateField(null=True)
+    archived_count = models.IntegerField(default=0)
+    archived_quantity = models.DecimalField(max_digits=10, decimal_places=2,
+                                            default=0)
+    archived_first_date = models.DateField(null=True)
+    archived_last_date = models.DateField(null=True)
+
+    class Meta:  # pylint: disable=I0011,C1001
+        """ Meta class for PurchaseRollup model """
+
+        # Set following fields manually since our models are in sub-directories
+        app_label = 'data'
+        db_table = 'sopin_purchase_rollup'
+
+        ordering = ['-month', 'item']
+        unique_together = [['item', 'month']]
+
+
+class PurchaseArchive(models.Model):
+    """
+    Purchase archive data model definition.
+    Purchases of an Item in a month, moved out of the purchase table, stored
+    as zlib compressed JSON.
+
+    """
+
+    item = models.ForeignKey(Item, related_name='archives')
+    month = models.DateField()
+    data = models.BinaryField()
+
+    class Meta:  # pylint: disable=I0011,C1001
+        """ Meta class for PurchaseArchive model """
+
+        # Set following fields manually since our models are in sub-directories
+        app_label = 'data'
+        db_table = 'sopin_purchase_archive'
+
+        index_together = [['item', 'month']]
+
+    @staticmethod
+    def compress(rows):
+        """ Return the archive data of (id, date, quantity) rows """
+
+        return zlib.compress(json.dumps(
+            [[r[0], str(r[1]), str(r[2])] for r in rows]).encode('utf-8'))
+
+    def purchases(self):
+        """ Return the archived purchases as unsaved Purchase instances """
+
+        return [Purchase(pk=r[0], item_id=self.item_id, date=_date(r[1]),
+                         quantity=decimal.Decimal(r[2]))
+                for r in json.loads(
+                    zlib.decompress(bytes(self.data)).decode('utf-8'))]
+
+
+@receiver(pre_save, sender=Purchase)
+def purchase_saving(sender, instance, **kwargs):
+    # pylint: disable=I0011,W0613
+    """ Keep the stored item, date and quantity of a purchase being changed """
+
+    # pylint: disable=I0011,W0212
+    instance._rolled_up = None
+
+    if instance.pk is not None:
+        instance._rolled_up = Purchase.objects.filter(
+            pk=instance.pk).values_list('item_id', 'date', 'quantity').first()
+
+
+@receiver(post_save, sender=Purchase)
+def purchase_saved(sender, instance, **kwargs):  # pylint: disable=I0011,W0613
+    """
+    Move the purchase out of the month it was in, if changed, and add it to
+    the month it is in now.
+
+    """
+
+    purchases = [(instance.item_id, instance.date, 1, instance.quantity)]
+
+    stored = getattr(instance, '_rolled_up', None)
+    if stored is not None:
+        purchases.insert(0, (stored[0], stored[1], -1, -stored[2]))
+
+    PurchaseRollup.objects.adjust(_changes(*purchases))
+
+
+@receiver(post_delete, sender=Purchase)
+def purchase_deleted(sender, instance, **kwargs):
+    # pylint: disable=I0011,W0613
+    """
+    Subtract the removed purchase from the rollup of it's month, with out
+    creating any, since the purchase may be removed along with the item.
+
+    """
+
+    PurchaseRollup.objects.adjust(_changes(
+        (instance.item_id, instance.date, -1, -instance.quantity)),
+        create=False)
+
+
+@receiver(purchases_created, sender=Purchase)
+def purchases_bulk_created(sender, purchases, **kwargs):
+    # pylint: disable=I0011,W0613
+    """ Add the purchases recorded in bulk to the rollups of their months """
+
+    PurchaseRollup.objects.adjust(_changes(
+        *[(p.item_id, p.date, 1, p.quantity) for p in purchases]))
@@ -0,0 +1,284 @@
+#  data/models/stock.py: Denormalized stock state of the shopping inventory
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Denormalized stock state of the shopping inventory """
+
+import datetime
+
+from django.db import models, connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from ..cache import deferred_versions
+from .inventory import Item, Purchase, purchases_created
+from .revision import Revision
+
+
+# Number of items to calculate the stock state of with a single query, kept
+# below the SQLite limit of query parameters
+CHUNK_SIZE = 500
+
+# Revision recorded when the stock state of all items is recomputed
+RECOMPUTE_REVISION = 'stock_state'
+
+
+class StockStateManager(models.Manager):
+    """ Model manager for StockState """
+
+    def refresh(self, item_ids=None, create=True):
+        """
+        Recalculate the stock state of given item(s), or all the items when
+        item_ids is None, from their most recent purchase and current
+        thresholds.
+        When create is False, only the existing state records will be updated.
+
+        """
+
+        if isinstance(item_ids, int):
+            item_ids = [item_ids]
+
+        if item_ids is None:
+            chunks = [None]
+        else:
+            item_ids = list(item_ids)
+            chunks = [item_ids[n:n + CHUNK_SIZE]
+                      for n in range(0, len(item_ids), CHUNK_SIZE)]
+
+        now = datetime.datetime.utcnow()
+
+        for chunk in chunks:
+            states = [(row[0], self._calculate(*row[1:], now=now))
+                      for row in self._latest_purchases(chunk)]
+
+            if 1 > len(states):
+                continue
+
+            cursor = connection.cursor()
+            cursor.executemany(
+                """
+                update
+                    sopin_stock_state
+                set
+                    last_purchase_date = %s,
+                    last_quantity = %s,
+                    threshold = %s,
+                    runout_date = %s,
+                    stock_age = %s,
+                    stock_age_percent = %s
+                where
+                    item_id = %s
+                """,
+                [(s['last_purchase_date'], s['last_quantity'], s['threshold'],
+                  s['runout_date'], s['stock_age'], s['stock_age_percent'],
+                  item_id) for item_id, s in states])
+
+            if create and cursor.rowcount < len(states):
+                existing = set(self.filter(
+                    pk__in=[i for i, _ in states]).values_list('pk',
+                                                               flat=True))
+
+                self.bulk_create([self.model(item_id=item_id, **s)
+                                  for item_id, s in states
+                                  if item_id not in existing])
+
+    def _latest_purchases(self, item_ids=None):
+        """
+        Return (id, purchase_threshold, extended_threshold, date, quantity)
+        of the given items (or all items) joined with their latest purchase.
+        Latest purchase is looked up through the (item_id, date) index, and
+        purchases on the same date are resolved by the most recent record.
+
+        """
+
+        sql = """
+            select
+                i.id,
+                i.purchase_threshold,
+                i.extended_threshold,
+                p.date,
+                p.quantity
+            from
+                sopin_item as i
+            left join sopin_purchase as p
+                on p.id = (
+                    select
+                        id
+                    from
+                        sopin_purchase
+                    where
+                        item_id = i.id
+                    order by
+                        date desc,
+                        id desc
+                    limit 1
+                )
+            """
+        params = []
+
+        if item_ids is not None:
+            sql += 'where i.id in (%s)' % ', '.join(['%s'] * len(item_ids))
+            params = list(item_ids)
+
+        cursor = connection.cursor()
+        cursor.execute(sql, params)
+
+        return cursor.fetchall()
+
+    def recompute(self, chunk_size=CHUNK_SIZE):
+        """
+        Recalculate the stock state of all the items, reading them a chunk at
+        a time, and record the stock age as of today for the running out list
+        to read. Return the number of items.
+
+        """
+
+        item_ids = list(Item.objects.values_list('pk', flat=True)
+                        .order_by('pk'))
+
+        # Cached data is invalidated only after the state is committed
+        with deferred_versions(), transaction.atomic():
+            for n in range(0, len(item_ids), chunk_size):
+                self.refresh(item_ids[n:n + chunk_size])
+
+            Revision.objects.touch(RECOMPUTE_REVISION)
+
+        return len(item_ids)
+
+    @staticmethod
+    def is_recomputed():
+        """
+        Return True when the stock age of all the items was recomputed today,
+        and kept current by every change since.
+
+        """
+
+        midnight = timezone.localtime(timezone.now()).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+
+        return Revision.objects.filter(pk=RECOMPUTE_REVISION,
+                                       modified__gte=midnight).exists()
+
+    @staticmethod
+    def _calculate(purchase_threshold, extended_threshold, date, quantity,
+                   now=None):
+        """
+        Return the stock state field values of a single item.
+        Stock age is in fractional days since the start (UTC) of the purchase
+        date, same as the running out list calculates it when not recomputed.
+
+        """
+
+        state = {
+            'last_purchase_date': date,
+            'last_quantity': quantity or 0,
+            'threshold': float(
+                (purchase_threshold * (quantity or 0)) + extended_threshold),
+            'runout_date': None,
+            'stock_age': -1,
+            'stock_age_percent': 0,
+        }
+
+        if date is not None:
+            if not isinstance(date, datetime.date):
+                date = parse_date(date)
+
+            # Thresholds beyond the last representable date never run out
+            if state['threshold'] < (datetime.date.max - date).days:
+                state['runout_date'] = date + datetime.timedelta(
+                    days=state['threshold'])
+            else:
+                state['runout_date'] = datetime.date.max
+
+            age = ((now or datetime.datetime.utcnow()) -
+                   datetime.datetime.combine(date, datetime.time())
+                   ).total_seconds() / 86400
+            state['stock_age'] = age
+
+            if 0 < age and age < state['threshold']:
+                state['stock_age_percent'] = age / state['threshold'] * 100
+
+        return state
+
+
+class StockState(models.Model):
+    """
+    Stock state data model definition.
+    One record per Item, kept current whenever the Item or it's Purchases
+    change, so the running out list can be read with out aggregating the
+    purchase history.
+
+    """
+
+    objects = StockStateManager()
+
+    item = models.OneToOneField(Item, primary_key=True,
+                                related_name='stock_state')
+    last_purchase_date = models.DateField(null=True)
+    last_quantity = models.DecimalField(max_digits=6, decimal_places=2,
+                                        default=0)
+    threshold = models.FloatField(default=0)
+    runout_date = models.DateField(null=True, db_index=True)
+
+    # Days since the last purchase (-1 when never purchased) and it's
+    # percentage of the threshold, as of the time the state was calculated
+    stock_age = models.FloatField(default=-1)
+    stock_age_percent = models.FloatField(default=0)
+
+    class Meta:  # pylint: disable=I0011,C1001
+        """ Meta class for StockState model """
+
+        # Set following fields manually since our models are in sub-directories
+        app_label = 'data'
+        db_table = 'sopin_stock_state'
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, **kwargs):  # pylint: disable=I0011,W0613
+    """ Item thresholds may have changed, recalculate it's stock state """
+
+    StockState.objects.refresh(instance.pk)
+
+
+@receiver(post_save, sender=Purchase)
+def purchase_saved(sender, instance, **kwargs):  # pylint: disable=I0011,W0613
+    """ Recalculate the stock state of the purchased item """
+
+    StockState.objects.refresh(instance.item_id)
+
+
+@receiver(post_delete, sender=Purchase)
+def purchase_deleted(sender, instance, **kwargs):
+    # pylint: disable=I0011,W0613
+    """
+    Recalculate the stock state of the item after removing a purchase.
+    State is not re-created here, since the purchase may be removed along with
+    the item itself.
+
+    """
+
+    StockState.objects.refresh(instance.item_id, create=False)
+
+
+@receiver(purchases_created, sender=Purchase)
+def purchases_bulk_created(sender, item_ids, **kwargs):
+    # pylint: disable=I0011,W0613
+    """ Recalculate the stock state of the purchased items """
+
+    StockState.objects.refresh(item_ids)
@@ -0,0 +1,38 @@
+#  data/pragmas.py: Database connection set up
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Database connection set up """
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def set_pragmas(sender, connection, **kwargs):  # pylint: disable=I0011,W0613
+    """ Apply SQLITE_PRAGMAS setting to each new SQLite connection """
+
+    if 'sqlite' != connection.vendor:
+        return
+
+    cursor = connection.cursor()
+
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', ()):
+        cursor.execute('pragma %s = %s' % (name, value))
+
+    cursor.close()
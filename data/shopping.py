@@ -0,0 +1,98 @@
+#  data/shopping.py: Shopping lists derived from the inventory
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Shopping lists derived from the inventory """
+
+import collections
+import datetime
+
+from django.core.cache import cache
+
+from .cache import get_version, make_key
+from .models.inventory import Item, STOCK_STATE_COLUMNS
+from .models.stock import StockState
+
+
+ShoppingLists = collections.namedtuple('ShoppingLists',
+                                       ['to_buy', 'running_out'])
+
+
+def shopping_lists():
+    """
+    Return the items to buy and the items running out, partitioned from the
+    running out list.
+    Lists are calculated once per inventory version and day, and shared by all
+    callers via the cache. Items are read only StockRow objects, with the
+    stock age precomputed for the day when the nightly recompute has run.
+
+    """
+
+    key = make_key('shopping_lists', get_version('inventory'),
+                   datetime.date.today())
+    lists = cache.get(key)
+
+    if lists is None:
+        lists = ShoppingLists([], [])
+        precomputed = StockState.objects.is_recomputed()
+
+        for i in Item.objects.running_out(instances=False,
+                                          precomputed=precomputed):
+            if 0 == i.stock_age_percent:
+                lists.to_buy.append(i)
+            else:
+                lists.running_out.append(i)
+
+        cache.set(key, lists, 24 * 60 * 60)
+
+    return lists
+
+
+def running_out_rows():
+    """
+    Yield the STOCK_STATE_COLUMNS rows of the items running out straight from
+    the database cursor, for the callers that stream the list. Stock age is
+    read the same way as the shopping lists read it.
+
+    """
+
+    return Item.objects.running_out_rows(
+        precomputed=StockState.objects.is_recomputed())
+
+
+def to_buy_rows():
+    """
+    Yield the STOCK_STATE_COLUMNS rows of the items to buy straight from the
+    database cursor, for the callers that stream the list.
+
+    """
+
+    percent = STOCK_STATE_COLUMNS.index('stock_age_percent')
+
+    return (row for row in running_out_rows() if 0 == row[percent])
+
+
+def stock_state_rows():
+    """
+    Yield the STOCK_STATE_COLUMNS rows of all the items straight from the
+    database cursor, with the stock age read the same way as the running out
+    rows.
+
+    """
+
+    return Item.objects.stock_state_rows(
+        precomputed=StockState.objects.is_recomputed())
@@ -0,0 +1,103 @@
+#  data/tests/test_forecast.py: Unit tests for consumption rate forecasting
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Unit test for consumption rate forecasting """
+
+import datetime
+
+from django.test import TestCase
+
+from data.forecast import consumption_rates
+from data.models.forecast import Forecast
+from data.models.inventory import Item, Purchase
+
+
+class ConsumptionRatesTest(TestCase):
+    """ Test consumption_rates() """
+
+    def test_rates_are_weighted_towards_recent_purchases(self):
+        """
+        Rate should be the exponentially weighted average of days per unit
+        between the purchases of each item.
+
+        """
+
+        items, rates, samples = consumption_rates(
+            [1, 1, 1, 1, 2, 2, 2],
+            [0, 10, 30, 40, 0, 7, 14],
+            [1, 1, 2, 1, 1, 1, 1])
+
+        self.assertEqual(items.tolist(), [1, 2])
+        self.assertEqual(samples.tolist(), [3, 2])
+        # 10 * .25 + 20 * .25 + 5 * .5 and 7 * .5 + 7 * .5
+        self.assertEqual(rates.tolist(), [10, 7])
+
+    def test_same_day_purchases_are_merged(self):
+        """ Purchases of an item on the same day should count as one """
+
+        items, rates, _ = consumption_rates(
+            [1, 1, 1, 1], [0, 0, 10, 20], [1, 1, 1, 1])
+
+        self.assertEqual(items.tolist(), [1])
+        # 10 / 2 * .5 + 10 / 1 * .5
+        self.assertEqual(rates.tolist(), [7.5])
+
+    def test_items_with_out_enough_history_are_skipped(self):
+        """ Items with less than min_samples intervals are not forecast """
+
+        self.assertEqual(consumption_rates([1, 1], [0, 5], [1, 1])[0]
+                         .tolist(), [])
+        self.assertEqual(consumption_rates([1, 1], [0, 5], [1, 1],
+                                           min_samples=1)[1].tolist(), [5])
+        self.assertEqual(consumption_rates([], [], [])[0].tolist(), [])
+
+
+class ForecastModelTest(TestCase):
+    """ Test "Forecast" data model """
+
+    def test_running_out_with_forecast(self):
+        """
+        Forecast mode of running_out should project the run out date from the
+        consumption rate of items with enough history, and fall back to the
+        purchase threshold for the others.
+
+        """
+
+        today = datetime.date.today()
+
+        frequent = Item.objects.create(name='a')
+        for days in (24, 16, 8, 2):
+            Purchase.objects.create(
+                item=frequent, date=today - datetime.timedelta(days))
+        Purchase.objects.create(item=Item.objects.create(name='b'),
+                                date=today - datetime.timedelta(20))
+
+        self.assertEqual(Forecast.objects.refresh(), 1)
+        self.assertAlmostEqual(Forecast.objects.get().days_per_unit, 7)
+
+        self.assertEqual([i.name for i in Item.objects.running_out()], ['b'])
+
+        items = Item.objects.running_out(forecast=True)
+
+        self.assertEqual([i.name for i in items], ['a', 'b'])
+        self.assertEqual(items[0].runout_date,
+                         today + datetime.timedelta(5))
+        self.assertAlmostEqual(items[0].stock_age_percent, 2 / 7 * 100,
+                               delta=10)
+        self.assertEqual(items[1].runout_date,
+                         today + datetime.timedelta(1))
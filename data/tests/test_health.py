@@ -0,0 +1,65 @@
+#  data/tests/test_health.py: Unit tests for database connection health check
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Unit test for database connection health check """
+
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from data.health import is_healthy, check_connections
+
+
+class HealthCheckTest(TestCase):
+    """ Test persistent connection health check """
+
+    def test_open_connection_is_healthy(self):
+        """ Working connection on the same database should be healthy """
+
+        connection.ensure_connection()
+
+        self.assertTrue(is_healthy(connection))
+
+    def test_replaced_database_file_is_not_healthy(self):
+        """
+        Connection should not be used after the database file it was opened
+        on is replaced.
+
+        """
+
+        connection.ensure_connection()
+
+        with mock.patch('data.health._file_id', return_value=(1, 2)):
+            self.assertFalse(is_healthy(connection))
+
+    def test_unhealthy_connections_are_closed(self):
+        """ Broken connections should be closed at the start of request """
+
+        connection.ensure_connection()
+
+        with mock.patch('data.health.is_healthy', return_value=False), \
+                mock.patch.object(connection, 'close') as close:
+            check_connections(None)
+            self.assertTrue(close.called)
+
+            close.reset_mock()
+
+            with self.settings(DB_HEALTH_CHECKS=False):
+                check_connections(None)
+            self.assertFalse(close.called)
@@ -19,12 +19,17 @@
 """ UI Unit test for inventory data models """
 
 import datetime
+import pickle
 
+from django.db import connection
+from django.db.models.signals import post_save, post_delete
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.core.exceptions import ValidationError
 from django.db.utils import IntegrityError
 
-from data.models.inventory import Item, Purchase
+from data.cache import get_version
+from data.models.inventory import Item, Purchase, StockRow, purchases_created
 
 
 class ItemModelTest(TestCase):
@@ -113,6 +118,59 @@ class ItemModelTest(TestCase):
         self.assertEqual(item2.last_purchase(), item2_last_purchase)
         self.assertEqual(Item.objects.get(pk=3).last_purchase(), None)
 
+    def test_last_purchase_is_reused_until_item_purchases_change(self):
+        """
+        last_purchase should not query the database again, on the same or a
+        different instance of the item, until a purchase of that item is
+        saved or removed.
+
+        """
+
+        item = Item.objects.create(name='a')
+        other_item = Item.objects.create(name='b')
+        p1 = Purchase.objects.create(item=item, date=datetime.date(2014, 1, 1))
+
+        self.assertEqual(item.last_purchase(), p1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(item.last_purchase(), p1)
+
+        item = Item.objects.get(pk=item.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(item.last_purchase(), p1)
+
+        Purchase.objects.create(item=other_item)
+        item = Item.objects.get(pk=item.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(item.last_purchase(), p1)
+
+        p2 = Purchase.objects.create(item=item, date=datetime.date(2014, 1, 2))
+        self.assertEqual(item.last_purchase(), p2)
+        self.assertEqual(Item.objects.get(pk=item.pk).last_purchase(), p2)
+
+        p2.delete()
+        self.assertEqual(Item.objects.get(pk=item.pk).last_purchase(), p1)
+
+    def test_version_changes_with_item_and_latest_purchase(self):
+        """
+        Version should stay the same until the item or the date of it's latest
+        purchase change.
+
+        """
+
+        item = Item.objects.create(name='a')
+        version = Item.objects.with_last_purchase().get(pk=item.pk).version
+
+        self.assertEqual(Item.objects.get(pk=item.pk).version, version)
+
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 1))
+        purchased = Item.objects.with_last_purchase().get(pk=item.pk).version
+        self.assertNotEqual(purchased, version)
+
+        item.heavy = True
+        item.save()
+        self.assertNotEqual(Item.objects.get(pk=item.pk).version, purchased)
+
     def test_running_out_item_stock_age_is_correctly_calculated(self):
         """ Verify that running_out item's stock_age is correct """
 
@@ -182,6 +240,83 @@ class ItemModelTest(TestCase):
         self.assertAlmostEqual(returned_item.stock_age_percent, 95.24,
                                delta=1.99)
 
+    def test_running_out_period_can_be_changed(self):
+        """
+        Number of days to look ahead for running out items should be
+        adjustable per query.
+
+        """
+
+        item = Item.objects.create(name='a')
+        Purchase.objects.create(
+            item=item, date=datetime.date.today() - datetime.timedelta(5))
+
+        self.assertEqual(Item.objects.running_out(), [])
+        self.assertEqual(Item.objects.running_out(16), [item])
+        self.assertEqual(Item.objects.running_out(16)[0].runout_date,
+                         datetime.date.today() + datetime.timedelta(16))
+
+    def test_running_out_between_returns_items_in_run_out_order(self):
+        """
+        running_out_between should only return the purchased items with run
+        out date in the given range, sorted by the run out date.
+
+        """
+
+        today = datetime.date.today()
+
+        Item.objects.create(name='never purchased')
+
+        i1 = Item.objects.create(name='a')
+        Purchase.objects.create(item=i1, date=today - datetime.timedelta(10))
+
+        i2 = Item.objects.create(name='b')
+        Purchase.objects.create(item=i2, date=today - datetime.timedelta(20))
+
+        i3 = Item.objects.create(name='c')
+        Purchase.objects.create(item=i3, date=today)
+
+        returned_items = Item.objects.running_out_between(
+            today, today + datetime.timedelta(11))
+
+        self.assertEqual(returned_items, [i2, i1])
+        self.assertEqual(returned_items[0].runout_date,
+                         today + datetime.timedelta(1))
+        self.assertEqual(returned_items[1].runout_date,
+                         today + datetime.timedelta(11))
+
+    def test_running_out_can_return_stock_rows(self):
+        """
+        running_out with out instances should return StockRow objects with
+        the same values as the Item instances it returns by default.
+
+        """
+
+        item = Item.objects.create(name='a', unit_symbol='kg')
+        Purchase.objects.create(
+            item=item, date=datetime.date.today() - datetime.timedelta(16))
+        Item.objects.create(name='b')
+
+        items = Item.objects.running_out()
+        rows = Item.objects.running_out(instances=False)
+
+        self.assertEqual([type(r) for r in rows], [StockRow, StockRow])
+        for item, row in zip(items, rows):
+            for name in StockRow.__slots__:
+                # Stock age is calculated from the current time by each query
+                if name.startswith('stock_age'):
+                    self.assertAlmostEqual(getattr(row, name),
+                                           getattr(item, name), 3, name)
+                else:
+                    self.assertEqual(getattr(row, name),
+                                     getattr(item, name), name)
+            self.assertEqual(row.pk, item.pk)
+
+        self.assertEqual(pickle.loads(pickle.dumps(rows)), rows)
+
+        with self.assertRaises(AttributeError):
+            rows[0].save = None
+
 
 class PurchaseModelTest(TestCase):
     """ Test "Purchase" data model """
@@ -209,6 +344,34 @@ class PurchaseModelTest(TestCase):
 
         # Date should now be populated
 
+    def test_saving_purchase_resets_threshold_with_out_loading_item(self):
+        """
+        Saving a purchase should reset the item extended threshold with a
+        conditional update, with out loading or re-writing the whole item.
+
+        """
+
+        item = Item.objects.create(name='a', extended_threshold=5)
+
+        with CaptureQueriesContext(connection) as queries:
+            Purchase.objects.create(item_id=item.id)
+
+        statements = [q['sql'] for q in queries.captured_queries]
+        self.assertEqual([q for q in statements
+                          if 'FROM "sopin_item"' in q and 'SELECT' in q], [])
+        self.assertEqual([q for q in statements
+                          if 'UPDATE "sopin_item" SET "name"' in q], [])
+        self.assertEqual(Item.objects.get(pk=item.id).extended_threshold, 0)
+
+        # Already loaded item instance should reflect the reset
+        item = Item.objects.get(pk=item.id)
+        Item.objects.filter(pk=item.id).update(extended_threshold=3)
+        item.extended_threshold = 3
+
+        Purchase.objects.create(item=item)
+
+        self.assertEqual(item.extended_threshold, 0)
+
     def test_retrieved_purchases_are_sorted_in_reverse_order(self):
         """
         Purchases retrieved back should be sorted in the reverse order of their
@@ -224,3 +387,120 @@ class PurchaseModelTest(TestCase):
         p4 = Purchase.objects.create(item=item)
 
         self.assertEqual(list(Purchase.objects.all()), [p4, p3, p2, p1])
+
+    def test_bulk_record_saves_purchases_with_set_based_queries(self):
+        """
+        Recording purchases in bulk should save them with a single insert and
+        reset the item extended thresholds with a single update.
+
+        """
+
+        items = [Item.objects.create(name=str(n), extended_threshold=n)
+                 for n in range(10)]
+
+        with CaptureQueriesContext(connection) as queries:
+            Purchase.objects.bulk_record(
+                [Purchase(item=i, date=datetime.date(2014, 1, 2), quantity=2)
+                 for i in items])
+
+        statements = [q['sql'] for q in queries.captured_queries]
+        self.assertEqual(len([q for q in statements
+                              if 'INSERT INTO "sopin_purchase"' in q]), 1)
+        self.assertEqual(len([q for q in statements
+                              if 'UPDATE "sopin_item"' in q]), 1)
+
+        self.assertEqual(Purchase.objects.count(), 10)
+        self.assertEqual(Item.objects.exclude(extended_threshold=0).count(), 0)
+        self.assertEqual(items[5].last_purchase().quantity, 2)
+        self.assertEqual(items[5].stock_state.last_quantity, 2)
+
+    def test_save_issues_versions_after_commit(self):
+        """
+        Cached data versions must not change until the purchase is committed,
+        since post_save receivers run in the transaction.
+
+        """
+
+        item = Item.objects.create(name='a')
+        key = 'purchase:%d' % item.pk
+        before = (get_version('inventory'), get_version(key))
+        seen = []
+
+        def receiver(**kwargs):  # pylint: disable=I0011,W0613
+            """ Record the versions as seen in the transaction """
+
+            seen.append((get_version('inventory'), get_version(key)))
+
+        post_save.connect(receiver, sender=Purchase)
+        self.addCleanup(post_save.disconnect, receiver, sender=Purchase)
+
+        Purchase.objects.create(item=item)
+
+        self.assertEqual(seen, [before])
+        self.assertNotEqual(get_version('inventory'), before[0])
+        self.assertNotEqual(get_version(key), before[1])
+
+    def test_delete_issues_versions_after_commit(self):
+        """
+        Cached data versions must not change until the removal of a purchase,
+        or an item along with it's purchases, is committed, since post_delete
+        receivers run in the transaction.
+
+        """
+
+        item = Item.objects.create(name='a')
+        Purchase.objects.create(item=item)
+        key = 'purchase:%d' % item.pk
+        seen = []
+
+        def receiver(**kwargs):  # pylint: disable=I0011,W0613
+            """ Record the versions as seen in the transaction """
+
+            seen.append((get_version('inventory'), get_version(key)))
+
+        post_delete.connect(receiver, sender=Item)
+        self.addCleanup(post_delete.disconnect, receiver, sender=Item)
+        post_delete.connect(receiver, sender=Purchase)
+        self.addCleanup(post_delete.disconnect, receiver, sender=Purchase)
+
+        before = (get_version('inventory'), get_version(key))
+        Purchase.objects.get().delete()
+
+        self.assertEqual(seen, [before])
+        self.assertNotEqual(get_version('inventory'), before[0])
+        self.assertNotEqual(get_version(key), before[1])
+
+        Purchase.objects.create(item=item)
+        Purchase.objects.create(item=item)
+        del seen[:]
+
+        before = (get_version('inventory'), get_version(key))
+        item.delete()
+
+        self.assertEqual(set(seen), set([before]))
+        self.assertNotEqual(get_version('inventory'), before[0])
+
+    def test_bulk_record_issues_versions_after_commit(self):
+        """
+        Cached data versions must not change until the purchases are
+        committed, or other requests may cache the data before the change
+        under the new version.
+
+        """
+
+        item = Item.objects.create(name='a')
+        before = get_version('inventory')
+        seen = []
+
+        def receiver(**kwargs):  # pylint: disable=I0011,W0613
+            """ Record the version as seen in the transaction """
+
+            seen.append(get_version('inventory'))
+
+        purchases_created.connect(receiver)
+        self.addCleanup(purchases_created.disconnect, receiver)
+
+        Purchase.objects.bulk_record([Purchase(item=item)])
+
+        self.assertEqual(seen, [before])
+        self.assertNotEqual(get_version('inventory'), before)
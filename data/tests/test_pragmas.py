@@ -0,0 +1,59 @@
+#  data/tests/test_pragmas.py: Unit tests for database connection set up
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Unit test for database connection set up """
+
+from django.db import connection
+from django.test import TestCase
+
+from data.pragmas import set_pragmas
+
+
+def _pragma(name):
+    """ Return the current value of the named pragma """
+
+    cursor = connection.cursor()
+    cursor.execute('pragma %s' % name)
+
+    return cursor.fetchone()[0]
+
+
+class PragmasTest(TestCase):
+    """ Test SQLite connection pragmas """
+
+    def test_pragmas_are_set_on_connection(self):
+        """ Connection should be set up with the SQLITE_PRAGMAS setting """
+
+        self.assertEqual(_pragma('busy_timeout'), 5000)
+        self.assertEqual(_pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(_pragma('cache_size'), -16384)
+
+    def test_pragmas_are_configurable(self):
+        """ Pragmas should be read from the settings """
+
+        # Test database connection is shared by the following tests
+        for name in ('cache_size', 'busy_timeout'):
+            self.addCleanup(connection.cursor().execute, 'pragma %s = %s' % (
+                name, _pragma(name)))
+
+        with self.settings(SQLITE_PRAGMAS=(('cache_size', -2048),
+                                           ('busy_timeout', 100))):
+            set_pragmas(None, connection)
+
+        self.assertEqual(_pragma('cache_size'), -2048)
+        self.assertEqual(_pragma('busy_timeout'), 100)
@@ -0,0 +1,62 @@
+#  data/tests/test_revision.py: Unit tests for change tracking data models
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Unit test for change tracking data models """
+
+from django.test import TestCase
+
+from data.models.inventory import Item, Purchase
+from data.models.revision import Revision
+
+
+class RevisionModelTest(TestCase):
+    """ Test "Revision" data model """
+
+    def test_changes_are_recorded(self):
+        """
+        Saving and removing items and purchases should record their
+        modification time.
+
+        """
+
+        self.assertEqual(Revision.objects.last_modified(), None)
+
+        item = Item.objects.create(name='a')
+        item_modified = Revision.objects.get(pk='item').modified
+
+        self.assertEqual(Revision.objects.last_modified(), item_modified)
+        self.assertFalse(Revision.objects.filter(pk='purchase').exists())
+
+        purchase = Purchase.objects.create(item=item)
+        purchase_modified = Revision.objects.get(pk='purchase').modified
+
+        self.assertEqual(Revision.objects.last_modified(), purchase_modified)
+
+        purchase.delete()
+
+        self.assertLess(purchase_modified,
+                        Revision.objects.get(pk='purchase').modified)
+
+    def test_last_modified_is_reused_until_inventory_changes(self):
+        """ Last modification time should be looked up once per change """
+
+        Item.objects.create(name='a')
+        Revision.objects.last_modified()
+
+        with self.assertNumQueries(0):
+            Revision.objects.last_modified()
@@ -0,0 +1,207 @@
+#  data/tests/test_rollup.py: Unit tests for purchase rollup data models
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Unit test for purchase rollup data models """
+
+import datetime
+import io
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from data.models.inventory import Item, Purchase
+from data.models.rollup import PurchaseRollup, PurchaseArchive
+from data.models.stock import StockState
+
+
+def _date(month, day):
+    """ Return a date in 2014 """
+
+    return datetime.date(2014, month, day)
+
+
+class PurchaseRollupModelTest(TestCase):
+    """ Test "PurchaseRollup" data model """
+
+    def setUp(self):
+        """ Purchase an item twice in January and once in February """
+
+        self.item = Item.objects.create(name='a')
+
+        Purchase.objects.create(item=self.item, date=_date(1, 20), quantity=2)
+        Purchase.objects.create(item=self.item, date=_date(1, 5))
+        Purchase.objects.create(item=self.item, date=_date(2, 1))
+
+    def rollups(self):
+        """ Return the (month, count, quantity, first, last) of the rollups """
+
+        return list(PurchaseRollup.objects.filter(
+            item=self.item).order_by('month').values_list(
+            'month', 'count', 'quantity', 'first_date', 'last_date'))
+
+    def test_purchases_are_rolled_up_by_month(self):
+        """ Each month should have the totals of it's purchases """
+
+        self.assertEqual(self.rollups(), [
+            (_date(1, 1), 2, 3, _date(1, 5), _date(1, 20)),
+            (_date(2, 1), 1, 1, _date(2, 1), _date(2, 1))])
+
+    def test_moving_purchase_to_another_month(self):
+        """ Changing the date of a purchase should move it between months """
+
+        purchase = Purchase.objects.get(date=_date(2, 1))
+        purchase.date = _date(1, 31)
+        purchase.save()
+
+        self.assertEqual(self.rollups(), [
+            (_date(1, 1), 3, 4, _date(1, 5), _date(1, 31))])
+
+    def test_removing_purchases(self):
+        """ Removing purchases should remove them from the rollups """
+
+        Purchase.objects.filter(date=_date(1, 20)).delete()
+
+        self.assertEqual(self.rollups()[0],
+                         (_date(1, 1), 1, 1, _date(1, 5), _date(1, 5)))
+
+        self.item.delete()
+
+        self.assertEqual(self.rollups(), [])
+
+    def test_changing_quantity_and_item_of_purchase(self):
+        """ Changed purchase should be moved between the item rollups """
+
+        other = Item.objects.create(name='b')
+
+        purchase = Purchase.objects.get(date=_date(1, 20))
+        purchase.quantity = 4
+        purchase.save()
+
+        self.assertEqual(self.rollups()[0],
+                         (_date(1, 1), 2, 5, _date(1, 5), _date(1, 20)))
+
+        purchase.item = other
+        purchase.save()
+
+        self.assertEqual(self.rollups()[0],
+                         (_date(1, 1), 1, 1, _date(1, 5), _date(1, 5)))
+        self.assertEqual(
+            list(PurchaseRollup.objects.filter(item=other).values_list(
+                'month', 'count', 'quantity', 'first_date', 'last_date')),
+            [(_date(1, 1), 1, 4, _date(1, 20), _date(1, 20))])
+
+    def test_removing_item_does_not_aggregate_history(self):
+        """
+        Removing an item should subtract each of it's purchases from it's
+        month, with out aggregating the whole purchase history of the item.
+
+        """
+
+        with CaptureQueriesContext(connection) as queries:
+            self.item.delete()
+
+        self.assertFalse([q for q in queries.captured_queries
+                          if 'group by' in q['sql'].lower()])
+        self.assertEqual(self.rollups(), [])
+
+    def test_removing_item_does_not_depend_on_purchase_count(self):
+        """
+        Removing an item should take the same number of queries regardless
+        of how many purchases it has.
+
+        """
+
+        other = Item.objects.create(name='b')
+        Purchase.objects.create(item=other, date=_date(1, 1))
+
+        with CaptureQueriesContext(connection) as queries:
+            other.delete()
+
+        with self.assertNumQueries(len(queries.captured_queries)):
+            self.item.delete()
+
+        self.assertEqual(self.rollups(), [])
+        self.assertEqual(Purchase.objects.count(), 0)
+
+    def test_bulk_recorded_purchases_are_rolled_up(self):
+        """ Purchases recorded in bulk should be added to the rollups """
+
+        Purchase.objects.bulk_record([
+            Purchase(item=self.item, date=_date(3, 3), quantity=5)])
+
+        self.assertEqual(self.rollups()[-1],
+                         (_date(3, 1), 1, 5, _date(3, 3), _date(3, 3)))
+
+        Purchase.objects.bulk_record([
+            Purchase(item=self.item, date=_date(3, 1), quantity=1),
+            Purchase(item=self.item, date=_date(3, 9), quantity=1)])
+
+        self.assertEqual(self.rollups()[-1],
+                         (_date(3, 1), 3, 7, _date(3, 1), _date(3, 9)))
+
+    def test_archive_keeps_totals_and_latest_purchase(self):
+        """
+        Archiving should move old purchases out of the purchase table, with
+        out changing the rollup totals or the latest purchase of any item.
+
+        """
+
+        other = Item.objects.create(name='b')
+        Purchase.objects.create(item=other, date=_date(1, 1))
+
+        rollups = self.rollups()
+
+        self.assertEqual(PurchaseRollup.objects.archive(_date(3, 1)), 2)
+
+        self.assertEqual(self.rollups(), rollups)
+        self.assertEqual(
+            list(Purchase.objects.values_list('item__name', 'date')),
+            [('a', _date(2, 1)), ('b', _date(1, 1))])
+        self.assertEqual(StockState.objects.get(pk=self.item.pk)
+                         .last_purchase_date, _date(2, 1))
+
+        archive = PurchaseArchive.objects.get()
+        self.assertEqual([(p.date, p.quantity) for p in archive.purchases()],
+                         [(_date(1, 5), 1), (_date(1, 20), 2)])
+
+        # Archived totals are kept when the rollups are recalculated
+        Purchase.objects.create(item=self.item, date=_date(1, 2))
+        PurchaseRollup.objects.refresh()
+
+        self.assertEqual(self.rollups(), [
+            (_date(1, 1), 3, 4, _date(1, 2), _date(1, 20)),
+            (_date(2, 1), 1, 1, _date(2, 1), _date(2, 1))])
+
+    def test_rollup_command(self):
+        """ Command should rebuild the rollups and archive old purchases """
+
+        PurchaseRollup.objects.all().delete()
+        out = io.StringIO()
+
+        call_command('rollup', stdout=out)
+
+        self.assertEqual(len(self.rollups()), 2)
+        self.assertEqual(Purchase.objects.count(), 3)
+
+        days = (datetime.date.today() - _date(2, 1)).days
+        call_command('rollup', archive=True, days=days, stdout=out)
+
+        self.assertEqual(Purchase.objects.count(), 1)
+        self.assertIn('Archived 2 purchases', out.getvalue())
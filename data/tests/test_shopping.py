@@ -0,0 +1,134 @@
+#  data/tests/test_shopping.py: Unit tests for shopping lists
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Unit test for shopping lists """
+
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from data.models.inventory import Item, Purchase
+from data.models.stock import StockState
+from data.shopping import shopping_lists, to_buy_rows
+
+
+class ShoppingListsTest(TestCase):
+    """ Test shopping_lists() """
+
+    def test_running_out_list_is_partitioned(self):
+        """
+        Items past their threshold should be in the "to buy" list, and the
+        rest of running out items in the "running out" list.
+
+        """
+
+        Item.objects.create(name='a')
+
+        item = Item.objects.create(name='b')
+        Purchase.objects.create(
+            item=item, date=datetime.date.today() - datetime.timedelta(22))
+
+        item = Item.objects.create(name='c')
+        Purchase.objects.create(
+            item=item, date=datetime.date.today() - datetime.timedelta(16))
+
+        lists = shopping_lists()
+
+        self.assertEqual([i.name for i in lists.to_buy], ['a', 'b'])
+        self.assertEqual([i.name for i in lists.running_out], ['c'])
+
+    def test_lists_are_reused_until_inventory_changes(self):
+        """
+        Lists should be calculated once and reused, until an item or a purchase
+        is changed.
+
+        """
+
+        item = Item.objects.create(name='a')
+        shopping_lists()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(len(shopping_lists().to_buy), 1)
+
+        Purchase.objects.create(item=item)
+        self.assertEqual(len(shopping_lists().to_buy), 0)
+
+        Item.objects.create(name='b')
+        self.assertEqual(len(shopping_lists().to_buy), 1)
+
+        item.delete()
+        Item.objects.get(name='b').delete()
+        self.assertEqual(len(shopping_lists().to_buy), 0)
+
+    def test_recomputed_state_is_read_with_out_date_math(self):
+        """
+        Once the stock state is recomputed for the day, lists should be read
+        from it with out calculating the stock age of each item.
+
+        """
+
+        item = Item.objects.create(name='a')
+        Purchase.objects.create(
+            item=item, date=datetime.date.today() - datetime.timedelta(16))
+        Item.objects.create(name='b')
+
+        live = shopping_lists()
+        StockState.objects.recompute()
+
+        with CaptureQueriesContext(connection) as queries:
+            lists = shopping_lists()
+
+        self.assertEqual([q['sql'] for q in queries.captured_queries
+                          if 'julianday' in q['sql']], [])
+        self.assertEqual([i.name for i in lists.to_buy],
+                         [i.name for i in live.to_buy])
+        self.assertEqual([i.name for i in lists.running_out],
+                         [i.name for i in live.running_out])
+        self.assertAlmostEqual(lists.running_out[0].stock_age, 16, delta=.99)
+
+    def test_recomputed_lists_are_partitioned_as_live_lists(self):
+        """
+        Lists read from the recomputed state should have the same items as
+        the lists calculated live, including the items purchased today.
+
+        """
+
+        today = datetime.date.today()
+
+        Item.objects.create(name='a')
+
+        for name, days, quantity in (('b', 0, 1), ('c', 3, 1), ('d', 5, 1),
+                                     ('e', 7, 1.5)):
+            Purchase.objects.create(
+                item=Item.objects.create(name=name, purchase_threshold=5),
+                date=today - datetime.timedelta(days), quantity=quantity)
+
+        live = shopping_lists()
+        live_rows = [row[1] for row in to_buy_rows()]
+        StockState.objects.recompute()
+        lists = shopping_lists()
+
+        self.assertTrue(StockState.objects.is_recomputed())
+        self.assertIn('b', [i.name for i in live.running_out])
+        self.assertEqual([i.name for i in lists.to_buy],
+                         [i.name for i in live.to_buy])
+        self.assertEqual([i.name for i in lists.running_out],
+                         [i.name for i in live.running_out])
+        self.assertEqual([row[1] for row in to_buy_rows()], live_rows)
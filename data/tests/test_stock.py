@@ -0,0 +1,203 @@
+#  data/tests/test_stock.py: Unit tests for stock state data models
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Unit test for stock state data models """
+
+import datetime
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from data.models.inventory import Item, Purchase
+from data.models.stock import StockState
+
+
+class StockStateModelTest(TestCase):
+    """ Test "StockState" data model """
+
+    def test_new_item_has_empty_stock_state(self):
+        """ Saving a new item should create a state with no purchase info """
+
+        item = Item.objects.create(name='a', extended_threshold=3)
+        state = StockState.objects.get(pk=item.pk)
+
+        self.assertEqual(state.last_purchase_date, None)
+        self.assertEqual(state.last_quantity, 0)
+        self.assertEqual(state.threshold, 3)
+        self.assertEqual(state.runout_date, None)
+
+    def test_purchase_updates_stock_state(self):
+        """
+        Saving purchases should keep the state pointed at the most recent
+        purchase of the item.
+
+        """
+
+        item = Item.objects.create(name='a')
+        Purchase.objects.create(item=item, quantity=2,
+                                date=datetime.date(2014, 1, 10))
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 1))
+
+        state = StockState.objects.get(pk=item.pk)
+
+        self.assertEqual(state.last_purchase_date, datetime.date(2014, 1, 10))
+        self.assertEqual(state.last_quantity, 2)
+        self.assertEqual(state.threshold, 42)
+        self.assertEqual(state.runout_date, datetime.date(2014, 2, 21))
+
+    def test_same_day_purchases_resolve_to_the_latest_record(self):
+        """
+        When an item is purchased more than once on the same date, the state
+        must always follow the most recently recorded purchase.
+
+        """
+
+        item = Item.objects.create(name='a')
+        Purchase.objects.create(item=item, quantity=3,
+                                date=datetime.date(2014, 1, 1))
+        Purchase.objects.create(item=item, quantity=1,
+                                date=datetime.date(2014, 1, 1))
+
+        StockState.objects.refresh()
+
+        state = StockState.objects.get(pk=item.pk)
+        self.assertEqual(state.last_quantity, 1)
+        self.assertEqual(state.runout_date, datetime.date(2014, 1, 22))
+        self.assertEqual(item.last_purchase().quantity, 1)
+
+    def test_removing_purchase_updates_stock_state(self):
+        """ Removing the latest purchase should fall back to the previous """
+
+        item = Item.objects.create(name='a')
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 1))
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 10))
+
+        Purchase.objects.filter(date=datetime.date(2014, 1, 10)).delete()
+
+        state = StockState.objects.get(pk=item.pk)
+        self.assertEqual(state.last_purchase_date, datetime.date(2014, 1, 1))
+        self.assertEqual(state.runout_date, datetime.date(2014, 1, 22))
+
+        Purchase.objects.all().delete()
+
+        state = StockState.objects.get(pk=item.pk)
+        self.assertEqual(state.last_purchase_date, None)
+        self.assertEqual(state.runout_date, None)
+
+    def test_item_edit_updates_stock_state(self):
+        """ Changing item thresholds should move the run out date """
+
+        item = Item.objects.create(name='a')
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 1))
+
+        item = Item.objects.get(pk=item.pk)
+        item.purchase_threshold = 10
+        item.extended_threshold = 5
+        item.save()
+
+        state = StockState.objects.get(pk=item.pk)
+        self.assertEqual(state.threshold, 15)
+        self.assertEqual(state.runout_date, datetime.date(2014, 1, 16))
+
+    def test_large_thresholds_run_out_on_the_last_date(self):
+        """
+        Thresholds past the last representable date should keep the run out
+        date at the last date, on item edit and on purchase.
+
+        """
+
+        item = Item.objects.create(name='a')
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 1))
+
+        item.purchase_threshold = 5000000
+        item.save()
+
+        state = StockState.objects.get(pk=item.pk)
+        self.assertEqual(state.threshold, 5000000)
+        self.assertEqual(state.runout_date, datetime.date.max)
+
+        # Threshold changed with out signals, so only the purchase updates it
+        Item.objects.filter(pk=item.pk).update(purchase_threshold=10 ** 7)
+        Purchase.objects.create(item=item, date=datetime.date(2014, 2, 1))
+
+        state = StockState.objects.get(pk=item.pk)
+        self.assertEqual(state.threshold, 10 ** 7)
+        self.assertEqual(state.runout_date, datetime.date.max)
+        self.assertNotIn(item, list(Item.objects.running_out()))
+
+    def test_removing_item_removes_stock_state(self):
+        """ Stock state must not outlive the item it belongs to """
+
+        item = Item.objects.create(name='a')
+        Purchase.objects.create(item=item)
+        Purchase.objects.create(item=item)
+
+        item.delete()
+
+        self.assertEqual(StockState.objects.count(), 0)
+
+    def test_stock_age_is_recorded_as_of_today(self):
+        """ State should keep the stock age in days and it's percentage """
+
+        item = Item.objects.create(name='a')
+
+        state = StockState.objects.get(pk=item.pk)
+        self.assertEqual(state.stock_age, -1)
+        self.assertEqual(state.stock_age_percent, 0)
+
+        Purchase.objects.create(
+            item=item, date=datetime.date.today() - datetime.timedelta(7))
+
+        state = StockState.objects.get(pk=item.pk)
+        self.assertAlmostEqual(state.stock_age, 7, delta=.99)
+        self.assertAlmostEqual(state.stock_age_percent,
+                               state.stock_age / 21 * 100)
+
+    def test_recompute_updates_all_items(self):
+        """
+        Recompute should refresh the state of every item, and mark the state
+        as recomputed for the day.
+
+        """
+
+        for name in 'abc':
+            Purchase.objects.create(
+                item=Item.objects.create(name=name),
+                date=datetime.date.today() - datetime.timedelta(7))
+
+        StockState.objects.update(stock_age=6, stock_age_percent=0)
+
+        self.assertFalse(StockState.objects.is_recomputed())
+        self.assertEqual(StockState.objects.recompute(chunk_size=2), 3)
+        self.assertTrue(StockState.objects.is_recomputed())
+
+        for age in StockState.objects.values_list('stock_age', flat=True):
+            self.assertAlmostEqual(age, 7, delta=.99)
+
+    def test_recompute_command(self):
+        """ Command should recompute and report the items per second """
+
+        Item.objects.create(name='a')
+        out = io.StringIO()
+
+        call_command('recompute', stdout=out)
+
+        self.assertTrue(StockState.objects.is_recomputed())
+        self.assertIn('Stock state: 1 items', out.getvalue())
+        self.assertIn('items/s', out.getvalue())
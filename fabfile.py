@@ -53,8 +53,6 @@ def deploy(version=''):
 def _setup_site(root, ref):
     """ Initialize static content, database and configuration """
 
-    run('%s/bin/python %s/src/manage.py collectstatic --noinput' %
-        (root, root))
     run('%s/bin/python %s/src/manage.py syncdb --migrate --noinput' %
         (root, root))
 
@@ -79,6 +77,10 @@ def _setup_site(root, ref):
     sed(settings_file, 'SECRET_KEY =.+$', 'SECRET_KEY = "%s"' % key)
     sed(settings_file, 'VERSION =.+$', 'VERSION = (%s, %s, "%s")' % tuple(ver))
 
+    # Static files are bundled and hashed with the production settings
+    run('%s/bin/python %s/src/manage.py collectstatic --noinput' %
+        (root, root))
+
 
 def _install_dependencies(root):
     """
@@ -98,7 +100,7 @@ def _get_source_from_git(source_dir, ref):
     run('cd %s && git reset --hard %s' % (source_dir, ref))
 
     # Remove source that is not required by production server
-    run('rm -fr %s/{{ui,data}/tests,ft,.git}' % source_dir)
+    run('rm -fr %s/{{ui,data}/tests,ft,bench,.git}' % source_dir)
     run('rm -f %s/{.coveragerc,.gitignore,fabfile.py,requirements-dev.txt}' %
         source_dir)
 
@@ -113,7 +115,7 @@ def _backup_current_site(root):
 def _init_directories(root):
     """ Create the base directory structure for the application """
 
-    run('mkdir -p %s/{src,var/{www,db,backup}}' % root)
+    run('mkdir -p %s/{src,var/{www,db,backup,cache}}' % root)
 
 
 def _verify_local_version(version):
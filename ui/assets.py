@@ -0,0 +1,349 @@
+#  ui/assets.py: Bundling and minification of the static assets
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Bundling and minification of the static assets.
+Bundles are defined in STATIC_BUNDLES setting as the bundle name and the list
+of static files concatenated in to it. Bundles are placed in the same
+directory as their sources, so relative url() references in CSS stay valid.
+Parts of the bundles not used by the pages are pruned; CSS rules with class
+names or ids, and jQuery plugins (in STATIC_PRUNE_PLUGINS sources) with names,
+not found in STATIC_PRUNE_CONTENT files, the JavaScript bundles or matching
+the STATIC_PRUNE_SAFELIST patterns.
+
+"""
+
+import gzip
+import io
+import os
+import re
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # Optional, only gzip variants are created with out it
+    brotli = None
+
+
+# Comments, except the ones marked to be preserved (/*! license */)
+CSS_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+CSS_SPACE = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+JS_LINE_COMMENT = re.compile(r'^\s*//.*$', re.M)
+JS_BLOCK_COMMENT = re.compile(r'^\s*/\*(?!!).*?\*/', re.M | re.S)
+
+WORD = re.compile(r'[\w-]+')
+
+# Parts of CSS selectors that don't need to match the page; attribute values,
+# strings and negations
+SELECTOR_IGNORED = re.compile(r'\[[^\]]*\]|"[^"]*"|\'[^\']*\'|:not\([^)]*\)')
+SELECTOR_NAME = re.compile(r'[.#](-?[_a-zA-Z][\w-]*)')
+
+# At-rules with style rules in them, pruned the same as the top level
+CSS_GROUP_RULES = ('@media', '@supports', '@document')
+
+# Start of each plugin of Bootstrap style jQuery plugin collections, and the
+# plugin name
+JS_PLUGIN = re.compile(r'\+function\(\w+\)\{"use strict";')
+JS_PLUGIN_NAME = re.compile(r'\.fn\.(\w+)\s*=')
+
+
+def minify_css(text):
+    """ Remove comments and white space that have no effect from CSS """
+
+    text = CSS_COMMENT.sub('', text)
+    text = CSS_SPACE.sub(' ', text)
+    text = CSS_PUNCTUATION.sub(r'\1', text)
+
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    """
+    Remove comments that start a line, indentation and blank lines from
+    JavaScript.
+    Only what can not be a part of a string or expression is removed, since
+    the sources are mostly minified already.
+
+    """
+
+    text = JS_BLOCK_COMMENT.sub('', text)
+    text = JS_LINE_COMMENT.sub('', text)
+
+    return '\n'.join(l.strip() for l in text.splitlines() if l.strip())
+
+
+def content_files(paths):
+    """
+    Yield the text of given files, and the files in given directories, with
+    paths relative to BASE_DIR.
+
+    """
+
+    for path in paths:
+        path = os.path.join(settings.BASE_DIR, path)
+
+        if os.path.isdir(path):
+            names = [os.path.join(root, name)
+                     for root, _, files in os.walk(path) for name in files]
+        else:
+            names = [path]
+
+        for name in sorted(names):
+            with open(name, encoding=settings.FILE_CHARSET) as f:
+                yield f.read()
+
+
+def _is_used(name, used, safelist):
+    """ Return True if the name is used or matches a safelist pattern """
+
+    return name in used or any(p.search(name) for p in safelist)
+
+
+def prune_plugins(js, used, safelist=()):
+    """
+    Remove the jQuery plugins with names not used from a Bootstrap style
+    collection of plugins. Plugins used by the ones left in are kept too,
+    along with any part of the script that doesn't define a plugin.
+
+    """
+
+    starts = [m.start() for m in JS_PLUGIN.finditer(js)]
+    if 1 > len(starts):
+        return js
+
+    plugins = [js[start:end]
+               for start, end in zip(starts, starts[1:] + [len(js)])]
+    kept = set()
+    used = set(used)
+
+    # Keep looking until no more plugins are used by the ones kept
+    while True:
+        found = set(n for n, plugin in enumerate(plugins) if n not in kept and
+                    all(_is_used(name, used, safelist)
+                        for name in JS_PLUGIN_NAME.findall(plugin)[:1]))
+
+        if 1 > len(found):
+            break
+
+        for n in found:
+            used.update(WORD.findall(plugins[n]))
+
+        kept.update(found)
+
+    return js[:starts[0]] + ''.join(p for n, p in enumerate(plugins)
+                                    if n in kept)
+
+
+def _block_end(css, start):
+    """ Return the position of the brace closing the block opened at start """
+
+    depth = 0
+    quote = None
+    escaped = False
+
+    for pos in range(start, len(css)):
+        char = css[pos]
+
+        if escaped:
+            escaped = False
+        elif '\\' == char:
+            escaped = True
+        elif quote is not None:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif '{' == char:
+            depth += 1
+        elif '}' == char:
+            depth -= 1
+
+            if 0 == depth:
+                return pos
+
+    return len(css)
+
+
+def _split_selectors(prelude):
+    """ Split a selector list on the commas not in brackets or strings """
+
+    selectors = []
+    depth = 0
+    quote = None
+    start = 0
+
+    for pos, char in enumerate(prelude):
+        if quote is not None:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif ',' == char and 0 == depth:
+            selectors.append(prelude[start:pos].strip())
+            start = pos + 1
+
+    selectors.append(prelude[start:].strip())
+
+    return selectors
+
+
+def prune_css(css, used, safelist=()):
+    """
+    Remove the selectors with class names or ids not used from the CSS, and
+    the rules left with out any selector. Rules with only element selectors
+    and at-rules other than the CSS_GROUP_RULES are always kept.
+
+    """
+
+    rules = []
+    pos = 0
+
+    while pos < len(css):
+        space = CSS_SPACE.match(css, pos)
+        if space is not None:
+            rules.append(space.group(0))
+            pos = space.end()
+
+        if css.startswith('/*', pos):
+            end = css.find('*/', pos)
+            end = len(css) if 0 > end else end + 2
+            rules.append(css[pos:end])
+            pos = end
+            continue
+
+        brace = css.find('{', pos)
+        semicolon = css.find(';', pos)
+
+        if 0 > brace:
+            rules.append(css[pos:])
+            break
+
+        # Statement at-rule, i.e. @charset or @import
+        if 0 <= semicolon < brace:
+            rules.append(css[pos:semicolon + 1])
+            pos = semicolon + 1
+            continue
+
+        end = _block_end(css, brace)
+        prelude = css[pos:brace]
+
+        if prelude.startswith(CSS_GROUP_RULES):
+            block = prune_css(css[brace + 1:end], used, safelist)
+
+            if 0 < len(block.strip()):
+                rules.append('%s{%s}' % (prelude, block))
+        elif prelude.startswith('@'):
+            rules.append(css[pos:end + 1])
+        else:
+            selectors = [
+                s for s in _split_selectors(prelude)
+                if all(_is_used(name, used, safelist) for name in
+                       SELECTOR_NAME.findall(SELECTOR_IGNORED.sub('', s)))]
+
+            if 0 < len(selectors):
+                rules.append(','.join(selectors) + css[brace:end + 1])
+
+        pos = end + 1
+
+    return ''.join(rules)
+
+
+def build_bundles(open_file, bundles=None):
+    """
+    Yield the name and pruned, minified content of each bundle in
+    STATIC_BUNDLES (or given bundles), reading the source files with
+    open_file(name).
+
+    """
+
+    if bundles is None:
+        bundles = settings.STATIC_BUNDLES
+
+    safelist = [re.compile(p) for p in settings.STATIC_PRUNE_SAFELIST]
+    used = set()
+    for content in content_files(settings.STATIC_PRUNE_CONTENT):
+        used.update(WORD.findall(content))
+
+    # Scripts are built first, since CSS classes they use must be kept
+    scripts = sorted(n for n in bundles if not n.endswith('.css'))
+    stylesheets = sorted(n for n in bundles if n.endswith('.css'))
+    script_words = set()
+
+    for name in scripts + stylesheets:
+        contents = []
+
+        for source in bundles[name]:
+            with open_file(source) as f:
+                content = f.read().decode(settings.FILE_CHARSET)
+
+            if source in settings.STATIC_PRUNE_PLUGINS:
+                content = prune_plugins(content, used, safelist)
+
+            contents.append(content)
+
+        if name.endswith('.css'):
+            content = prune_css('\n'.join(minify_css(c) for c in contents),
+                                used | script_words, safelist)
+        else:
+            # Guard against sources with out a trailing semicolon
+            content = ';\n'.join(minify_js(c) for c in contents)
+            script_words.update(WORD.findall(content))
+
+        yield name, content.encode(settings.FILE_CHARSET)
+
+
+def _gzip(content):
+    """ Return content gzip compressed, with out a time stamp """
+
+    buf = io.BytesIO()
+
+    with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=9, mtime=0) as f:
+        f.write(content)
+
+    return buf.getvalue()
+
+
+def compressed_variants(name, content):
+    """
+    Yield the name and content of the .gz (and .br when brotli is available)
+    variants of a static file to be served by Apache in place of it, if the
+    file type is one of STATIC_COMPRESS_EXTENSIONS and compressing makes it
+    smaller.
+
+    """
+
+    if not name.endswith(settings.STATIC_COMPRESS_EXTENSIONS):
+        return
+
+    variants = [('.gz', _gzip)]
+
+    if brotli is not None:
+        variants.append(('.br', brotli.compress))
+
+    for extension, compress in variants:
+        compressed = compress(content)
+
+        if len(compressed) < len(content):
+            yield name + extension, compressed
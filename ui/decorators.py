@@ -0,0 +1,141 @@
+#  ui/decorators.py: View decorators for the web site
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" View decorators for the web site """
+
+import functools
+import hashlib
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from app.settings import VERSION
+
+from data.cache import get_version, make_key
+from data.models.revision import Revision
+
+
+RESPONSE_TIMEOUT = 24 * 60 * 60
+
+
+def _inventory_state():
+    """
+    Return a string identifying the inventory data a page is rendered from;
+    the inventory version, local date (running out status changes with the
+    date) and the application version (templates change with it).
+
+    """
+
+    return '%s:%s:%s' % (get_version('inventory'),
+                         timezone.localtime(timezone.now()).date(),
+                         '.'.join(str(v) for v in VERSION))
+
+
+def _is_cacheable(request):
+    """
+    Only the GET requests of pages with out pending messages for the user can
+    be validated or cached.
+
+    """
+
+    return (request.method in ('GET', 'HEAD') and
+            0 == len(messages.get_messages(request)))
+
+
+def _etag(request, *args, **kwargs):  # pylint: disable=I0011,W0613
+    """ Return the ETag of the requested page in current inventory state """
+
+    if not _is_cacheable(request):
+        return None
+
+    return hashlib.md5((request.get_full_path() +
+                        _inventory_state()).encode('utf-8')).hexdigest()
+
+
+def _last_modified(request, *args, **kwargs):  # pylint: disable=I0011,W0613
+    """
+    Return the last modification time of the inventory, or the start of the
+    day if that is later, since pages show date dependent information.
+
+    """
+
+    if not _is_cacheable(request):
+        return None
+
+    midnight = timezone.localtime(timezone.now()).replace(
+        hour=0, minute=0, second=0, microsecond=0)
+
+    return max(Revision.objects.last_modified() or midnight, midnight)
+
+
+def inventory_conditional(view):
+    """
+    Set ETag and Last-Modified headers of a view that depends only on the
+    inventory data, and answer conditional GET requests for unchanged pages
+    with "304 Not Modified" with out calling the view.
+
+    """
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        """ Call the view and make browsers re-validate the response """
+
+        response = view(request, *args, **kwargs)
+
+        if _is_cacheable(request):
+            # Let the browser keep the page, but always re-validate it
+            patch_cache_control(response, private=True, max_age=0,
+                                must_revalidate=True)
+
+        return response
+
+    return condition(etag_func=_etag,
+                     last_modified_func=_last_modified)(wrapper)
+
+
+def inventory_cached(view):
+    """
+    Cache the full response of a view that depends only on the inventory
+    data, until an Item or Purchase changes or the date rolls over.
+    Conditional requests are handled as in inventory_conditional.
+
+    """
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        """ Return the cached response, or call the view and cache it """
+
+        if not _is_cacheable(request):
+            return view(request, *args, **kwargs)
+
+        key = make_key('response', view.__module__, view.__name__,
+                       request.get_full_path(), _inventory_state())
+        response = cache.get(key)
+
+        if response is None:
+            response = view(request, *args, **kwargs)
+
+            if 200 == response.status_code:
+                cache.set(key, response, RESPONSE_TIMEOUT)
+
+        return response
+
+    return inventory_conditional(wrapper)
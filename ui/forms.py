@@ -95,3 +95,8 @@ class PurchaseForm(forms.models.ModelForm):
                 'class': 'form-control number',
             }),
         }
+
+
+# Validates a list of purchases together, for recording them in bulk
+BulkPurchaseFormSet = forms.models.modelformset_factory(
+    Purchase, form=PurchaseForm, extra=0, min_num=1, validate_min=True)
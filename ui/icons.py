@@ -0,0 +1,169 @@
+#  ui/icons.py: Trimming icon fonts down to the icons used in templates
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Trimming icon fonts down to the icons used in templates.
+Icon fonts are defined in STATIC_ICON_FONTS setting as the icon class prefix
+(i.e. "fa" for "fa-edit"), the stylesheet defining the icon classes and the
+font file name with out the extension. Icon class rules of the icons not
+found in templates are removed from the stylesheet, and the fonts are subset
+to the glyphs of the remaining ones.
+
+"""
+
+import html
+import io
+import logging
+import re
+
+from django.conf import settings
+from django.template.utils import get_app_template_dirs
+from fontTools import subset
+
+from ui.assets import content_files
+
+
+# Font formats subset, with the fontTools flavor of each binary format.
+# Embedded OpenType is left as it is, since it can not be written.
+FONT_FORMATS = (('.ttf', None), ('.woff', 'woff'), ('.svg', None))
+
+ICON_RULE = (r'(?:^|(?<=\}})|(?<=\*/))(?P<space>\s*)'
+             r'(?P<selectors>\.{0}-[\w-]+:before'
+             r'(?:\s*,\s*\.{0}-[\w-]+:before)*)'
+             r'\s*\{{\s*content:\s*"\\(?P<code>[0-9a-fA-F]+)";?\s*\}}')
+ICON_SELECTOR = re.compile(r'\.([\w-]+):before')
+
+SVG_GLYPH = re.compile(r'\s*<glyph\b[^>]*?unicode="([^"]*)"[^>]*>')
+
+# Tables fontTools can not subset (i.e. FontForge time stamps) are dropped,
+# with a warning for each font
+logging.getLogger('fontTools.subset').setLevel(logging.ERROR)
+
+
+def used_icons(prefix, directories=None):
+    """
+    Return the set of icon classes with given prefix found in the templates
+    of given (or all the template) directories.
+
+    """
+
+    if directories is None:
+        directories = list(settings.TEMPLATE_DIRS) + list(
+            get_app_template_dirs('templates'))
+
+    pattern = re.compile(r'\b%s-[a-z0-9-]+' % re.escape(prefix))
+    icons = set()
+
+    for content in content_files(directories):
+        icons.update(pattern.findall(content))
+
+    return icons
+
+
+def trim_css(css, prefix, icons):
+    """
+    Remove the rules of the icon classes with given prefix not in icons from
+    the CSS, and return it along with the set of code points of the icons
+    left in.
+
+    """
+
+    codes = set()
+
+    def replace(match):
+        """ Keep the selectors of the used icons, or drop the rule """
+
+        selectors = [s for s in ICON_SELECTOR.findall(match.group('selectors'))
+                     if s in icons]
+
+        if 1 > len(selectors):
+            return ''
+
+        codes.add(int(match.group('code'), 16))
+
+        return '%s%s{content:"\\%s"}' % (
+            match.group('space'),
+            ','.join('.%s:before' % s for s in selectors),
+            match.group('code'))
+
+    css = re.sub(ICON_RULE.format(re.escape(prefix)), replace, css)
+
+    return css, codes
+
+
+def subset_svg(svg, codes):
+    """ Remove the glyphs not in given code points from a SVG font """
+
+    def replace(match):
+        """ Keep the glyphs of a single character in codes """
+
+        char = html.unescape(match.group(1))
+
+        return match.group(0) if 1 == len(char) and ord(char) in codes else ''
+
+    return SVG_GLYPH.sub(replace, svg)
+
+
+def subset_font(content, codes, flavor=None):
+    """ Return a TrueType or WOFF font subset to given code points """
+
+    options = subset.Options()
+    options.flavor = flavor
+
+    font = subset.load_font(io.BytesIO(content), options)
+
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codes)
+    subsetter.subset(font)
+
+    buf = io.BytesIO()
+    subset.save_font(font, buf, options)
+
+    return buf.getvalue()
+
+
+def trim_icon_fonts(open_file, icon_fonts=None):
+    """
+    Yield the name and trimmed content of the stylesheet and font files of
+    each icon font in STATIC_ICON_FONTS (or given icon_fonts), reading the
+    files with open_file(name).
+
+    """
+
+    if icon_fonts is None:
+        icon_fonts = settings.STATIC_ICON_FONTS
+
+    for prefix, stylesheet, font in icon_fonts:
+        with open_file(stylesheet) as f:
+            css = f.read().decode(settings.FILE_CHARSET)
+
+        css, codes = trim_css(css, prefix, used_icons(prefix))
+
+        yield stylesheet, css.encode(settings.FILE_CHARSET)
+
+        for extension, flavor in FONT_FORMATS:
+            with open_file(font + extension) as f:
+                content = f.read()
+
+            if '.svg' == extension:
+                content = subset_svg(content.decode('utf-8'),
+                                     codes).encode('utf-8')
+            else:
+                content = subset_font(content, codes, flavor)
+
+            yield font + extension, content
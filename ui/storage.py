@@ -0,0 +1,87 @@
+#  ui/storage.py: Static files storage of the web site
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Static files storage of the web site """
+
+from urllib.parse import urlsplit
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from ui.assets import build_bundles, compressed_variants
+from ui.icons import trim_icon_fonts
+
+
+class BundleStorage(ManifestStaticFilesStorage):
+    """
+    Static files storage that trims the STATIC_ICON_FONTS and builds the
+    STATIC_BUNDLES from the collected files before they are post processed,
+    so the results get content hashed names in the manifest along with all
+    the other files.
+    Compressed variants of the hashed files are saved next to them, for
+    Apache to serve with out compressing on each request.
+
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            # Read from the source of each file, not the collected copy which
+            # may be left trimmed by the previous run
+            def open_source(name):
+                """ Open the file of given name where it was collected from """
+
+                storage, path = paths[name]
+
+                return storage.open(path)
+
+            for name, content in trim_icon_fonts(open_source):
+                self._save_processed(paths, name, content)
+
+            for name, content in build_bundles(open_source):
+                self._save_processed(paths, name, content)
+
+        for result in super(BundleStorage, self).post_process(
+                paths, dry_run, **options):
+            yield result
+
+        if not dry_run:
+            # Names referenced from CSS may have a query string and fragment
+            self._save_compressed(set(urlsplit(name).path
+                                      for name in self.hashed_files.values()))
+
+    def _save_processed(self, paths, name, content):
+        """ Save a file created from the collected files to be hashed """
+
+        if self.exists(name):
+            self.delete(name)
+
+        self._save(name, ContentFile(content))
+        paths[name] = (self, name)
+
+    def _save_compressed(self, names):
+        """ Save the compressed variants of given files """
+
+        for name in names:
+            with self.open(name) as f:
+                content = f.read()
+
+            for variant, compressed in compressed_variants(name, content):
+                if self.exists(variant):
+                    self.delete(variant)
+
+                self._save(variant, ContentFile(compressed))
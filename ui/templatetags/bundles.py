@@ -0,0 +1,46 @@
+#  ui/templatetags/bundles.py: Template tags for the static asset bundles
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Template tags for the static asset bundles """
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.templatetags.staticfiles import static
+from django.utils.html import format_html_join
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name):
+    """
+    Render the tag(s) to load a bundle from STATIC_BUNDLES setting; the
+    (content hashed) bundle itself, or each of it's source files in DEBUG
+    mode.
+
+    """
+
+    files = settings.STATIC_BUNDLES[name] if settings.DEBUG else [name]
+
+    if name.endswith('.css'):
+        html = '<link rel="stylesheet" href="{0}" />'
+    else:
+        html = '<script src="{0}"></script>'
+
+    return format_html_join('\n', html, ((static(f), ) for f in files))
@@ -76,3 +76,16 @@ class BaseUnitTestCase(TestCase):
         self.assertIn('site_version', response.context)
         self.assertEqual(response.context['site_version'], ('v%d.%d %s' %
                                                             VERSION).strip())
+
+    def response_has_no_validators(self):
+        """
+        Verify that a page carrying the CSRF token of the user can not be
+        validated with the inventory state, and re-used once the token changes
+
+        """
+
+        response = self.client.get(self.uri)
+
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
@@ -0,0 +1,132 @@
+#  ui/tests/test_api.py: Unit tests for the JSON read API
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" UI Unit test for the JSON read API """
+
+import datetime
+import json
+
+from ui.tests.base import BaseUnitTestCase
+
+from data.models.inventory import Item, Purchase
+from data.models.stock import StockState
+
+
+class ApiTest(BaseUnitTestCase):
+    """ JSON API unit test """
+
+    def setUp(self):
+        """ Create an item to buy, one running out and one in stock """
+
+        super(ApiTest, self).setUp()
+
+        today = datetime.date.today()
+
+        Purchase.objects.create(item=Item.objects.create(name='Test #1'),
+                                date=today - datetime.timedelta(22))
+        Purchase.objects.create(item=Item.objects.create(name='Test #2'),
+                                date=today - datetime.timedelta(16))
+        Purchase.objects.create(item=Item.objects.create(name='Test #3'),
+                                date=today)
+
+    def get_json(self, uri):
+        """ Request given uri and return the decoded streaming response """
+
+        response = self.client.get(uri)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['content-type'], 'application/json')
+
+        return json.loads(b''.join(response.streaming_content).decode())
+
+    def test_running_out_list(self):
+        """ Running out list should include the items to buy """
+
+        data = self.get_json('/api/running-out/')
+
+        self.assertEqual([i['name'] for i in data], ['Test #2', 'Test #1'])
+        self.assertEqual(data[0]['runout_date'], (
+            datetime.date.today() + datetime.timedelta(5)).isoformat())
+        self.assertAlmostEqual(data[0]['stock_age_percent'], 16 / 21 * 100,
+                               delta=5)
+        self.assertAlmostEqual(data[1]['stock_age'], 22, delta=1)
+        self.assertEqual(data[1]['stock_age_percent'], 0)
+
+    def test_to_buy_list(self):
+        """ To buy list should only include items already run out """
+
+        data = self.get_json('/api/to-buy/')
+
+        self.assertEqual([i['name'] for i in data], ['Test #1'])
+        self.assertEqual(sorted(data[0].keys()), sorted([
+            'id', 'name', 'unit_symbol', 'unit_weight', 'purchase_threshold',
+            'extended_threshold', 'heavy', 'stock_age', 'stock_age_percent',
+            'runout_date']))
+
+    def test_lists_read_the_same_recomputed_stock_age(self):
+        """
+        Once the stock state is recomputed for the day, all the lists should
+        read the stock age recorded by it, so an item is either in the to buy
+        list or running out with a percentage, never both.
+
+        """
+
+        StockState.objects.recompute()
+
+        # Stock age as recorded before the threshold was crossed
+        StockState.objects.filter(item__name='Test #1').update(
+            stock_age=20, stock_age_percent=95)
+
+        data = self.get_json('/api/running-out/')
+        self.assertEqual([(i['name'], i['stock_age_percent']) for i in data
+                          if i['name'] == 'Test #1'], [('Test #1', 95)])
+
+        self.assertEqual(self.get_json('/api/to-buy/'), [])
+
+        data = self.get_json('/api/items/')
+        self.assertEqual(data[0]['stock_age_percent'], 95)
+
+    def test_items_list(self):
+        """ Items list should include all the items by name """
+
+        data = self.get_json('/api/items/')
+
+        self.assertEqual([i['name'] for i in data],
+                         ['Test #1', 'Test #2', 'Test #3'])
+
+    def test_empty_list(self):
+        """ An empty list should still be valid JSON """
+
+        Item.objects.all().delete()
+
+        self.assertEqual(self.get_json('/api/items/'), [])
+
+    def test_conditional_get(self):
+        """ Unchanged lists should not be sent again """
+
+        response = self.client.get('/api/items/')
+        response = self.client.get('/api/items/',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_read_only(self):
+        """ API should not accept POST requests """
+
+        self.assertEqual(self.client.post('/api/items/').status_code, 405)
@@ -0,0 +1,215 @@
+#  ui/tests/test_assets.py: Unit tests for the static asset bundles
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" UI Unit test for the static asset bundles """
+
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from ui.assets import (compressed_variants, minify_css, minify_js,
+                       prune_css, prune_plugins)
+
+
+BUNDLES = {
+    'css/test.bundle.css': ('css/font-awesome.css', 'css/bootstrap.css'),
+    'js/test.bundle.js': ('js/jquery.js', 'js/bootstrap.js'),
+}
+
+
+class MinifyTest(SimpleTestCase):
+    """ CSS and JavaScript minification unit test """
+
+    def test_css_comments_and_space_are_removed(self):
+        """ Only the preserved comments and significant space should stay """
+
+        self.assertEqual(
+            minify_css('/*! license */\n/* note */\na  b ,\nc {\n'
+                       '  color: red;\n  margin: 0 auto;\n}\n'),
+            '/*! license */ a b,c{color: red;margin: 0 auto}')
+
+    def test_js_comments_and_blank_lines_are_removed(self):
+        """ Strings that look like comments must be left alone """
+
+        self.assertEqual(
+            minify_js('/*! license */\n/* note\n  more */\n\n'
+                      '  // note\n  var a = "//b";\n\n  f("/* c */");\n'),
+            '/*! license */\nvar a = "//b";\nf("/* c */");')
+
+
+class PruneTest(SimpleTestCase):
+    """ Pruning the unused parts of the bundles unit test """
+
+    def test_unused_css_selectors_are_removed(self):
+        """
+        Selectors with class names or ids not used should be removed, along
+        with the rules and media queries left empty.
+
+        """
+
+        css = ('/*! license */ body{margin:0}.btn,.carousel{color:red}'
+               '#menu>.open:hover,.x:not(.y){content:"{a}"}'
+               '@font-face{src:url(a.eot)}'
+               '@media (min-width:768px){.carousel{color:red}}'
+               '@media print{a[href*=".carousel"]{color:red}'
+               '.alert-warning{color:red}}')
+
+        self.assertEqual(
+            prune_css(css, set(['btn', 'menu', 'open', 'x']),
+                      [re.compile(r'^alert-')]),
+            '/*! license */ body{margin:0}.btn{color:red}'
+            '#menu>.open:hover,.x:not(.y){content:"{a}"}'
+            '@font-face{src:url(a.eot)}'
+            '@media print{a[href*=".carousel"]{color:red}'
+            '.alert-warning{color:red}}')
+
+    def test_unused_plugins_are_removed(self):
+        """ Plugins used by the kept plugins should be kept too """
+
+        js = ('/*! license */\nif(1)throw 0;'
+              '+function(a){"use strict";a.fn.transition=1}(jQuery),'
+              '+function(a){"use strict";a.fn.tooltip=a.fn.transition}'
+              '(jQuery),'
+              '+function(a){"use strict";a.fn.popover=a.fn.tooltip}(jQuery),'
+              '+function(a){"use strict";a.fn.modal=a.fn.transition}'
+              '(jQuery);')
+
+        self.assertEqual(
+            prune_plugins(js, set(['popover'])),
+            '/*! license */\nif(1)throw 0;'
+            '+function(a){"use strict";a.fn.transition=1}(jQuery),'
+            '+function(a){"use strict";a.fn.tooltip=a.fn.transition}'
+            '(jQuery),'
+            '+function(a){"use strict";a.fn.popover=a.fn.tooltip}(jQuery),')
+
+
+class CompressTest(SimpleTestCase):
+    """ Compressed variants of static files unit test """
+
+    def test_gzip_variant(self):
+        """ Text files should get a gzip variant, identical on every build """
+
+        content = b'body { color: red; }\n' * 100
+        variants = dict(compressed_variants('css/a.css', content))
+
+        self.assertEqual(gzip.decompress(variants['css/a.css.gz']), content)
+        self.assertEqual(dict(compressed_variants('css/a.css', content)),
+                         variants)
+
+    def test_no_variants_that_are_not_smaller(self):
+        """ Already compressed, or too small files should be left alone """
+
+        self.assertEqual(
+            list(compressed_variants('fonts/a.woff', b'a' * 1000)), [])
+        self.assertEqual(list(compressed_variants('css/a.css', b'a')), [])
+
+
+@override_settings(STATIC_BUNDLES=BUNDLES)
+class BundleTagTest(SimpleTestCase):
+    """ {% bundle %} template tag unit test """
+
+    @staticmethod
+    def render(name):
+        """ Render the tag of given bundle """
+
+        return Template(
+            '{% load bundles %}{% bundle "' + name + '" %}').render(Context())
+
+    def test_bundle_is_loaded(self):
+        """ Bundle itself should be loaded when not debugging """
+
+        self.assertEqual(
+            self.render('css/test.bundle.css'),
+            '<link rel="stylesheet" href="/static/css/test.bundle.css" />')
+        self.assertEqual(self.render('js/test.bundle.js'),
+                         '<script src="/static/js/test.bundle.js"></script>')
+
+    @override_settings(DEBUG=True)
+    def test_sources_are_loaded_while_debugging(self):
+        """ Each source file should be loaded separately when debugging """
+
+        self.assertEqual(self.render('js/test.bundle.js'),
+                         '<script src="/static/js/jquery.js"></script>\n'
+                         '<script src="/static/js/bootstrap.js"></script>')
+
+
+class CollectStaticTest(SimpleTestCase):
+    """ Building the bundles with collectstatic unit test """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_bundles_are_hashed_in_manifest(self):
+        """
+        Bundles should be saved with content hashed names along with their
+        sources, and CSS references point to the hashed files.
+
+        """
+
+        with override_settings(STATIC_ROOT=self.root, STATIC_BUNDLES=BUNDLES,
+                               STATICFILES_STORAGE='ui.storage.BundleStorage'):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+            url = staticfiles_storage.url('css/test.bundle.css')
+
+        with open(os.path.join(self.root, 'staticfiles.json')) as manifest:
+            paths = json.load(manifest)['paths']
+
+        self.assertRegex(paths['css/test.bundle.css'],
+                         r'^css/test\.bundle\.[0-9a-f]{12}\.css$')
+        self.assertRegex(paths['js/test.bundle.js'],
+                         r'^js/test\.bundle\.[0-9a-f]{12}\.js$')
+        self.assertEqual(url, '/static/' + paths['css/test.bundle.css'])
+
+        with open(os.path.join(self.root,
+                               paths['css/test.bundle.css'])) as bundle:
+            css = bundle.read()
+
+        self.assertIn(paths['fonts/fontawesome-webfont.woff'], css)
+        self.assertNotIn('\n\n', css)
+
+        # Rules of the classes not used in templates or scripts pruned
+        self.assertIn('.modal-backdrop', css)
+        self.assertNotIn('.carousel', css)
+
+        with open(os.path.join(self.root,
+                               paths['js/test.bundle.js'])) as bundle:
+            js = bundle.read()
+
+        self.assertIn('.fn.modal=', js)
+        self.assertNotIn('.fn.carousel=', js)
+
+        # Icon rules trimmed to the ones used in templates
+        self.assertIn('.fa-usd:before', css)
+        self.assertNotIn('.fa-glass:before', css)
+
+        with gzip.open(os.path.join(
+                self.root, paths['css/test.bundle.css'] + '.gz'), 'rt') as f:
+            self.assertEqual(f.read(), css)
+
+        self.assertFalse(os.path.exists(os.path.join(
+            self.root, paths['fonts/fontawesome-webfont.woff'] + '.gz')))
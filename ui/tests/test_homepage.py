@@ -19,10 +19,12 @@
 """ UI Unit test for homepage """
 
 import datetime
+import json
 
 from ui.tests.base import BaseUnitTestCase
 
 from data.models.inventory import Item, Purchase
+from data.models.stock import StockState
 
 
 class HomepageTest(BaseUnitTestCase):
@@ -94,26 +96,57 @@ class HomepageTest(BaseUnitTestCase):
         self.assertEqual(response.context['to_buy_list'][0].name,
                          'Test #1')
 
+    def test_response_is_reused_until_inventory_changes(self):
+        """
+        Homepage should be served from the cache with out any queries, until
+        an item or a purchase changes.
 
-class DownloadTest(BaseUnitTestCase):
-    """ "To Buy" Download unit test """
+        """
 
-    uri = '/download-to-buy/'
-    template = 'download.txt'
+        item = Item.objects.create(name='Test #1')
+        first = self.client.get(self.uri)
 
-    def test_uri_render_correct_template(self):
-        """ Call base class function """
+        with self.assertNumQueries(0):
+            second = self.client.get(self.uri)
 
-        self.uri_render_correct_template()
+        self.assertEqual(first.content, second.content)
 
-    def test_receives_the_to_buy_list_via_context(self):
+        Purchase.objects.create(item=item)
+        third = self.client.get(self.uri)
+
+        self.assertNotEqual(first.content, third.content)
+        self.assertNotEqual(first['ETag'], third['ETag'])
+
+    def test_conditional_get_of_unchanged_page_is_not_modified(self):
         """
-        Download template should have the list of items need to be purchased in
-        it's context.
+        Requesting the page with the ETag of last response should return "304
+        Not Modified", until the inventory changes.
 
         """
 
-        item = Item.objects.create(name='Test #1')
+        response = self.client.get(self.uri)
+        etag = response['ETag']
+
+        response = self.client.get(self.uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Item.objects.create(name='Test #1')
+
+        response = self.client.get(self.uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class DownloadTest(BaseUnitTestCase):
+    """ "To Buy" Download unit test """
+
+    uri = '/download-to-buy/'
+
+    def setUp(self):
+        """ Create an item to buy and one running out """
+
+        super(DownloadTest, self).setUp()
+
+        item = Item.objects.create(name='Test #1', unit_symbol='kg')
         Purchase.objects.create(
             item=item, date=datetime.date.today() - datetime.timedelta(22))
 
@@ -121,10 +154,77 @@ class DownloadTest(BaseUnitTestCase):
         Purchase.objects.create(
             item=item, date=datetime.date.today() - datetime.timedelta(16))
 
-        response = self.client.get(self.uri)
+    def download(self, uri):
+        """ Request given uri and return the response and it's content """
 
-        self.assertEqual(type(response.context['to_buy_list']),
-                         type([]))
-        self.assertEqual(len(response.context['to_buy_list']), 1)
-        self.assertEqual(response.context['to_buy_list'][0].name,
-                         'Test #1')
+        response = self.client.get(uri)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_text_download_is_the_default(self):
+        """ Download should be the "[] name" text list of items to buy """
+
+        response, content = self.download(self.uri)
+
+        self.assertEqual(content, '[] Test #1\n')
+        self.assertTrue(response['content-type'].startswith('text/plain'))
+        self.assertEqual(
+            response['content-disposition'],
+            'attachment; filename=shopping-list-%s.txt' % (
+                datetime.date.today().strftime('%Y-%m-%d'), ))
+
+    def test_csv_download(self):
+        """ CSV download should have a header and a line per item """
+
+        response, content = self.download(self.uri + '?format=csv')
+
+        self.assertTrue(response['content-type'].startswith('text/csv'))
+        self.assertTrue(response['content-disposition'].endswith('.csv'))
+
+        lines = content.splitlines()
+        self.assertEqual(lines[0],
+                         'name,unit_weight,unit_symbol,stock_age,runout_date')
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('Test #1,1,kg,'))
+
+    def test_json_download(self):
+        """ JSON download should be an array of the items to buy """
+
+        response, content = self.download(self.uri + '?format=json')
+
+        self.assertEqual(response['content-type'], 'application/json')
+        self.assertEqual([i['name'] for i in json.loads(content)],
+                         ['Test #1'])
+
+    def test_markdown_download(self):
+        """ Markdown download should be a check list of the items to buy """
+
+        response, content = self.download(self.uri + '?format=md')
+
+        self.assertTrue(response['content-disposition'].endswith('.md'))
+        self.assertEqual(content, '- [ ] Test #1\n')
+
+    def test_download_is_the_list_shown_on_the_homepage(self):
+        """ Download should have the same items to buy as the homepage """
+
+        response = self.client.get('/')
+        shown = [i.name for i in response.context['to_buy_list']]
+
+        # Changed with out a new inventory version, as if by another process
+        # between the two requests
+        StockState.objects.filter(item__name='Test #1').update(
+            last_purchase_date=datetime.date.today())
+
+        response, content = self.download(self.uri + '?format=json')
+
+        self.assertEqual([i['name'] for i in json.loads(content)], shown)
+
+    def test_unknown_format_is_not_found(self):
+        """ Formats other than the supported ones should not be found """
+
+        response = self.client.get(self.uri + '?format=xml')
+
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,102 @@
+#  ui/tests/test_icons.py: Unit tests for trimming the icon fonts
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" UI Unit test for trimming the icon fonts """
+
+import io
+import os
+
+from django.conf import settings
+from django.test import SimpleTestCase
+from fontTools.ttLib import TTFont
+
+from ui.icons import subset_font, subset_svg, trim_css, used_icons
+
+
+FONT = os.path.join(settings.BASE_DIR, 'ui/static/fonts/fontawesome-webfont')
+
+CSS = """/* icons */
+.fa-glass:before {
+  content: "\\f000";
+}
+.fa-edit:before,
+.fa-pencil-square-o:before {
+  content: "\\f044";
+}
+.fa-lg {
+  font-size: 1.3em;
+}
+.btn .fa-glass:before{content:"\\f000"}
+.fa-usd:before{content:"\\f155"}.fa-euro:before{content:"\\f153"}"""
+
+
+class IconFontTest(SimpleTestCase):
+    """ Icon font trimming unit test """
+
+    def test_icons_are_found_in_templates(self):
+        """ All icon classes of the prefix should be found """
+
+        icons = used_icons('fa')
+
+        self.assertIn('fa-shopping-cart', icons)
+        self.assertIn('fa-usd', icons)
+        self.assertEqual(set(i for i in icons if not i.startswith('fa-')),
+                         set())
+        self.assertEqual(used_icons('glyphicon'), set())
+
+    def test_unused_icon_rules_are_removed(self):
+        """
+        Only the rules and selectors of the used icons should be left, along
+        with the rules that are not icon definitions.
+
+        """
+
+        css, codes = trim_css(CSS, 'fa', set(['fa-edit', 'fa-usd']))
+
+        self.assertEqual(css, """/* icons */
+.fa-edit:before{content:"\\f044"}
+.fa-lg {
+  font-size: 1.3em;
+}
+.btn .fa-glass:before{content:"\\f000"}
+.fa-usd:before{content:"\\f155"}""")
+        self.assertEqual(codes, set([0xf044, 0xf155]))
+
+    def test_svg_font_subset(self):
+        """ SVG font should only have the glyphs of given code points """
+
+        with open(FONT + '.svg', encoding='utf-8') as f:
+            svg = subset_svg(f.read(), set([0xf07a, 0xf155]))
+
+        self.assertEqual(svg.count('<glyph '), 2)
+        self.assertIn('<glyph unicode="&#xf07a;"', svg)
+        self.assertIn('<missing-glyph', svg)
+        self.assertTrue(svg.rstrip().endswith('</svg>'))
+
+    def test_font_subset(self):
+        """ TrueType and WOFF fonts should only map given code points """
+
+        with open(FONT + '.ttf', 'rb') as f:
+            content = f.read()
+
+        for flavor in (None, 'woff'):
+            font = TTFont(io.BytesIO(subset_font(content, set([0xf07a]),
+                                                 flavor)))
+
+            self.assertEqual(font.flavor, flavor)
+            self.assertEqual(list(font.getBestCmap()), [0xf07a])
@@ -18,6 +18,7 @@
 
 """ UI Unit test for item add/edit """
 
+import datetime
 import random
 import json
 
@@ -25,7 +26,8 @@ from ui.tests.base import BaseUnitTestCase
 
 from ui.forms import ItemForm
 
-from data.models.inventory import Item
+from data.models.inventory import Item, Purchase
+from data.models.stock import StockState
 
 
 class ItemAddFormTest(BaseUnitTestCase):
@@ -39,6 +41,11 @@ class ItemAddFormTest(BaseUnitTestCase):
 
         self.uri_render_correct_template()
 
+    def test_form_has_no_validators(self):
+        """ Call base class function """
+
+        self.response_has_no_validators()
+
     def test_template_receive_the_form_via_context(self):
         """
         Item form template should have the ItemForm instance in it's context.
@@ -181,3 +188,26 @@ class ItemEditFormTest(BaseUnitTestCase):
         self.assertEqual(saved_item.unit_weight, 1)
         self.assertEqual(saved_item.purchase_threshold, 21)
         self.assertEqual(saved_item.extended_threshold, 0)
+
+    def test_form_POST_with_a_large_threshold_updates_stock_state(self):
+        """
+        Thresholds past the last representable date should be saved, with the
+        stock state kept current.
+
+        """
+
+        Item.objects.create(name='Test Item A')
+        item = Item.objects.create(name='Test Item B')
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 1))
+
+        self.client.post(self.uri, data={
+            'id': 2,
+            'name': 'Test Item B',
+            'unit_weight': '1',
+            'purchase_threshold': '5000000',
+            'extended_threshold': '0',
+        })
+
+        state = StockState.objects.get(pk=item.pk)
+        self.assertEqual(state.threshold, 5000000)
+        self.assertEqual(state.runout_date, datetime.date.max)
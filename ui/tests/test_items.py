@@ -18,11 +18,15 @@
 
 """ UI Unit test for item maintenance page """
 
+import datetime
+from unittest import mock
+
+from django.core.urlresolvers import reverse
 from django.db.models.query import QuerySet
 
 from ui.tests.base import BaseUnitTestCase
 
-from data.models.inventory import Item
+from data.models.inventory import Item, Purchase
 
 
 class ItemsPageTest(BaseUnitTestCase):
@@ -86,6 +90,151 @@ class ItemsPageTest(BaseUnitTestCase):
 
             self.assertEqual(test_item, template_item)
 
+    def test_item_list_is_rendered_with_constant_number_of_queries(self):
+        """
+        Item list along with the last purchase of each item must be fetched
+        with the same number of queries regardless of the item count.
+
+        """
+
+        for n in range(5):
+            item = Item.objects.create(name='Item %d' % n)
+            Purchase.objects.create(item=item,
+                                    date=datetime.date(2014, 1, n + 1))
+
+        # Item list and the last modification time of the inventory
+        with self.assertNumQueries(2):
+            response = self.client.get(self.uri)
+
+        self.assertContains(response, 'January, 5<sup>th</sup>')
+
+        for n in range(5, 50):
+            item = Item.objects.create(name='Item %d' % n)
+            Purchase.objects.create(item=item, date=datetime.date(2014, 1, 1))
+
+        with self.assertNumQueries(2):
+            self.client.get(self.uri)
+
+    def test_unchanged_rows_are_rendered_from_cache(self):
+        """
+        Rows should be rendered once, and again only when the item or it's
+        latest purchase change.
+
+        """
+
+        for name in ['Item A', 'Item B']:
+            Item.objects.create(name=name)
+
+        with mock.patch('django.core.urlresolvers.reverse',
+                        wraps=reverse) as url:
+            self.client.get(self.uri)
+            rendered = url.call_count
+
+            url.reset_mock()
+            self.client.get(self.uri)
+
+            # Three URLs of each row were not reversed
+            self.assertEqual(url.call_count, rendered - 6)
+
+        item = Item.objects.get(name='Item B')
+        item.name = 'Item C'
+        item.save()
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 5))
+
+        response = self.client.get(self.uri)
+
+        self.assertContains(response, 'Item C')
+        self.assertContains(response, 'January, 5<sup>th</sup>')
+
+    def test_conditional_get_of_unchanged_page_is_not_modified(self):
+        """
+        Requesting the page with the validators of last response should return
+        "304 Not Modified", until the inventory changes.
+
+        """
+
+        Item.objects.create(name='Item A')
+        response = self.client.get(self.uri)
+
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(
+            self.uri, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        validators = {
+            'HTTP_IF_MODIFIED_SINCE': response['Last-Modified'],
+            'HTTP_IF_NONE_MATCH': response['ETag'],
+        }
+        Item.objects.create(name='Item B')
+
+        # Last-Modified is only accurate to the second, ETag should tell
+        # the change apart
+        response = self.client.get(self.uri, **validators)
+        self.assertEqual(response.status_code, 200)
+
+    def test_page_with_pending_messages_is_always_rendered(self):
+        """ Messages must be shown even if the items did not change """
+
+        Item.objects.create(name='Item A')
+        response = self.client.get(self.uri)
+
+        self.client.get('/item-maintenance/remove/999/')
+
+        response = self.client.get(self.uri,
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'does not exists')
+
+    @mock.patch('ui.views.item.ITEMS_PAGE_SIZE', 2)
+    def test_items_are_listed_a_page_at_a_time(self):
+        """
+        Item list should contain ITEMS_PAGE_SIZE items following the name given
+        in "after" parameter, and name to continue the list from.
+
+        """
+
+        for name in ['Item A', 'Item B', 'Item C', 'Item D', 'Item E']:
+            Item.objects.create(name=name)
+
+        response = self.client.get(self.uri)
+
+        self.assertEqual([i.name for i in response.context['item_list']],
+                         ['Item A', 'Item B'])
+        self.assertEqual(response.context['next_page'], 'Item B')
+        self.assertContains(response, '?after=Item%20B')
+
+        response = self.client.get(self.uri, {'after': 'Item D'})
+
+        self.assertEqual([i.name for i in response.context['item_list']],
+                         ['Item E'])
+        self.assertEqual(response.context['next_page'], None)
+        self.assertNotContains(response, 'id="btn_load_more"')
+
+    @mock.patch('ui.views.item.ITEMS_PAGE_SIZE', 2)
+    def test_load_more_renders_only_the_table_rows(self):
+        """
+        Requesting the next page with "rows" parameter should only render the
+        rows, and return the name to continue from in "X-Next-Page" header.
+
+        """
+
+        for name in ['Item A', 'Item B', 'Item C', 'Item D', 'Item E']:
+            Item.objects.create(name=name)
+
+        response = self.client.get(self.uri, {'after': 'Item B', 'rows': 1})
+
+        self.assertTemplateUsed(response, 'items/rows.html')
+        self.assertTemplateNotUsed(response, 'items/list.html')
+        self.assertContains(response, '<tr>', count=2)
+        self.assertEqual(response['X-Next-Page'], 'Item%20D')
+
+        response = self.client.get(self.uri, {'after': 'Item D', 'rows': 1})
+
+        self.assertContains(response, '<tr>', count=1)
+        self.assertEqual(response['X-Next-Page'], '')
+
 
 class ItemRemoveTest(BaseUnitTestCase):
     """ Item remove function related unit test """
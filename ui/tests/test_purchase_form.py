@@ -26,6 +26,7 @@ from ui.tests.base import BaseUnitTestCase
 from ui.forms import PurchaseForm
 
 from data.models.inventory import Item, Purchase
+from data.models.stock import StockState
 
 
 class ItemPurchaseFormTest(BaseUnitTestCase):
@@ -39,6 +40,11 @@ class ItemPurchaseFormTest(BaseUnitTestCase):
 
         self.uri_render_correct_template()
 
+    def test_form_has_no_validators(self):
+        """ Call base class function """
+
+        self.response_has_no_validators()
+
     def test_template_receive_the_form_via_context(self):
         """
         Purchase form template should have the PurchaseForm instance in it's
@@ -156,3 +162,105 @@ class ItemPurchaseFormTest(BaseUnitTestCase):
 
         saved_purchase = Purchase.objects.first()
         self.assertEqual(saved_purchase.item.extended_threshold, 0)
+
+
+class BulkPurchaseTest(BaseUnitTestCase):
+    """ Bulk purchase entry unit test """
+
+    uri = '/item-maintenance/purchase/bulk/'
+
+    def test_JSON_POST_saves_all_purchases(self):
+        """
+        Posting a list of purchases should save them all, reset the extended
+        thresholds and update the stock state of the purchased items.
+
+        """
+
+        i1 = Item.objects.create(name='test item #1', extended_threshold=5)
+        i2 = Item.objects.create(name='test item #2')
+
+        response = self.client.post(self.uri, content_type='application/json',
+                                    data=json.dumps([
+                                        {'item': i1.id, 'date': '2014-01-01',
+                                         'quantity': '1'},
+                                        {'item': i2.id, 'date': '2014-01-01',
+                                         'quantity': '2'},
+                                        {'item': i1.id, 'date': '2014-01-02',
+                                         'quantity': '1.5'},
+                                    ]))
+
+        self.assertEqual(json.loads(response.content.decode('utf-8')),
+                         {'code': 0, 'message': 'success', 'count': 3})
+
+        self.assertEqual(Purchase.objects.count(), 3)
+        self.assertEqual(Item.objects.get(pk=i1.id).extended_threshold, 0)
+
+        state = StockState.objects.get(pk=i1.id)
+        self.assertEqual(state.last_purchase_date, datetime.date(2014, 1, 2))
+        self.assertEqual(state.last_quantity, 1.5)
+
+        self.assertEqual(Item.objects.get(pk=i2.id).last_purchase().quantity,
+                         2)
+
+    def test_formset_POST_saves_all_purchases(self):
+        """ Standard form set data should be accepted as well """
+
+        item = Item.objects.create(name='test item #1')
+
+        self.client.post(self.uri, data={
+            'form-TOTAL_FORMS': '2',
+            'form-INITIAL_FORMS': '0',
+            'form-0-item': str(item.id),
+            'form-0-date': '2014-01-01',
+            'form-0-quantity': '1',
+            'form-1-item': str(item.id),
+            'form-1-date': '2014-01-03',
+            'form-1-quantity': '1',
+        })
+
+        self.assertEqual(Purchase.objects.count(), 2)
+
+    def test_nothing_is_saved_when_any_purchase_is_invalid(self):
+        """
+        An invalid row should reject the whole list and report the errors.
+
+        """
+
+        item = Item.objects.create(name='test item #1')
+
+        response = self.client.post(self.uri, content_type='application/json',
+                                    data=json.dumps([
+                                        {'item': item.id, 'date': '2014-01-01',
+                                         'quantity': '1'},
+                                        {'item': 999, 'date': '2014-01-01',
+                                         'quantity': 'x'},
+                                    ]))
+
+        self.assertEqual(response.status_code, 400)
+
+        result = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(result['code'], 1)
+        self.assertEqual(result['errors'][0], {})
+        self.assertIn('item', result['errors'][1])
+        self.assertIn('quantity', result['errors'][1])
+
+        self.assertEqual(Purchase.objects.count(), 0)
+
+    def test_empty_list_is_rejected(self):
+        """ At least one purchase must be submitted """
+
+        response = self.client.post(self.uri, content_type='application/json',
+                                    data='[]')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_JSON_other_than_a_list_of_objects_is_rejected(self):
+        """ Well-formed JSON of any other shape must be a bad request """
+
+        for body in ['{"item": 1}', '[1, 2]', '"x"', '[{"item": 1}, null]']:
+            response = self.client.post(self.uri, data=body,
+                                        content_type='application/json')
+
+            self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(Purchase.objects.count(), 0)
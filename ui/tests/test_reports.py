@@ -0,0 +1,132 @@
+#  ui/tests/test_reports.py: Unit tests for the reports
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" UI Unit test for the reports """
+
+import datetime
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ui.tests.base import BaseUnitTestCase
+
+from data.models.inventory import Item, Purchase
+from data.models.rollup import PurchaseRollup
+
+
+class MonthlyPurchaseReportTest(BaseUnitTestCase):
+    """ Monthly purchase report unit test """
+
+    uri = '/reports/monthly-purchase/'
+    template = 'reports/monthly_purchase.html'
+    page_title = 'Monthly Purchase'
+
+    def setUp(self):
+        """ Purchase two items in January and one in March """
+
+        super(MonthlyPurchaseReportTest, self).setUp()
+
+        item = Item.objects.create(name='b', unit_symbol='kg')
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 3))
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 9),
+                                quantity=2)
+
+        item = Item.objects.create(name='a')
+        Purchase.objects.create(item=item, date=datetime.date(2014, 1, 5))
+        Purchase.objects.create(item=item, date=datetime.date(2014, 3, 5))
+
+    def test_uri_render_correct_template(self):
+        """ Call base class function """
+
+        self.uri_render_correct_template()
+
+    def test_site_title_is_being_passed_to_the_template(self):
+        """ Call base class function """
+
+        self.site_title_is_being_passed_to_the_template()
+
+    def test_site_version_is_being_passed_to_the_template(self):
+        """ Call base class function """
+
+        self.site_version_is_being_passed_to_the_template()
+
+    def test_report_lists_the_purchases_of_the_month(self):
+        """ Report should list the rollups of the month by item name """
+
+        response = self.client.get(self.uri + '?month=2014-01')
+
+        rollups = response.context['rollup_list']
+        self.assertEqual([(r.item.name, r.count, r.quantity) for r in rollups],
+                         [('a', 1, 1), ('b', 2, 3)])
+        self.assertEqual(response.context['totals'],
+                         {'purchases': 3, 'items': 2})
+        self.assertEqual(response.context['previous_month'], None)
+        self.assertEqual(response.context['next_month'],
+                         datetime.date(2014, 3, 1))
+
+    def test_report_does_not_read_purchases(self):
+        """ Report should be read from the rollups only """
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.uri + '?month=2014-03')
+
+        self.assertEqual([q['sql'] for q in queries.captured_queries
+                          if '"sopin_purchase"' in q['sql']], [])
+
+    def test_saving_purchase_updates_only_its_month(self):
+        """
+        Saving a purchase should update the rollup of it's month, and leave
+        the rollups of the other months untouched.
+
+        """
+
+        PurchaseRollup.objects.filter(month=datetime.date(2014, 1, 1)).update(
+            count=9)
+
+        purchase = Purchase.objects.get(date=datetime.date(2014, 3, 5))
+        purchase.quantity = 3
+        purchase.save()
+
+        response = self.client.get(self.uri + '?month=2014-01')
+        self.assertEqual([r.count for r in response.context['rollup_list']],
+                         [9, 9])
+
+        response = self.client.get(self.uri + '?month=2014-03')
+        self.assertEqual([(r.item.name, r.count, r.quantity)
+                          for r in response.context['rollup_list']],
+                         [('a', 1, 3)])
+
+    def test_csv_export(self):
+        """ CSV export should have a header and a line per item """
+
+        response = self.client.get(self.uri + '?month=2014-01&format=csv')
+
+        self.assertTrue(response['content-type'].startswith('text/csv'))
+        self.assertTrue(response['content-disposition'].endswith(
+            'monthly-purchase-2014-01.csv'))
+        self.assertEqual(response.content.decode().splitlines(), [
+            'name,purchases,quantity,unit_symbol,first_date,last_date',
+            'a,1,1.00,,2014-01-05,2014-01-05',
+            'b,2,3.00,kg,2014-01-03,2014-01-09'])
+
+    def test_invalid_month_is_not_found(self):
+        """ Month should be in YYYY-MM format """
+
+        response = self.client.get(self.uri + '?month=January')
+
+        self.assertEqual(response.status_code, 404)
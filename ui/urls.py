@@ -39,4 +39,16 @@ urlpatterns = patterns(
     # Purchase
     url(r'^item-maintenance/purchase/$',
         'views.purchase.form_view', name='item_purchase_form'),
+    url(r'^item-maintenance/purchase/bulk/$',
+        'views.purchase.bulk_view', name='item_purchase_bulk'),
+
+    # Reports
+    url(r'^reports/monthly-purchase/$', 'views.report.monthly_purchase_view',
+        name='report_monthly_purchase'),
+
+    # JSON API
+    url(r'^api/running-out/$', 'views.api.running_out_view',
+        name='api_running_out'),
+    url(r'^api/to-buy/$', 'views.api.to_buy_view', name='api_to_buy'),
+    url(r'^api/items/$', 'views.api.items_view', name='api_items'),
 )
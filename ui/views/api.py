@@ -0,0 +1,58 @@
+#  ui/views/api.py: JSON read API of the shopping inventory
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" JSON read API views """
+
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_safe
+
+from ui.decorators import inventory_conditional
+
+from data import export
+from data.shopping import running_out_rows, to_buy_rows, stock_state_rows
+
+
+def _json_response(rows):
+    """ Return a streaming JSON response of given stock state rows """
+
+    return StreamingHttpResponse(export.json_array(rows),
+                                 content_type='application/json')
+
+
+@require_safe
+@inventory_conditional
+def running_out_view(request):  # pylint: disable=I0011,W0613
+    """ Out put the items running out, including the ones to buy """
+
+    return _json_response(running_out_rows())
+
+
+@require_safe
+@inventory_conditional
+def to_buy_view(request):  # pylint: disable=I0011,W0613
+    """ Out put the items that needs to be purchased now """
+
+    return _json_response(to_buy_rows())
+
+
+@require_safe
+@inventory_conditional
+def items_view(request):  # pylint: disable=I0011,W0613
+    """ Out put all the items with their stock state """
+
+    return _json_response(stock_state_rows())
@@ -20,53 +20,53 @@
 
 import datetime
 
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render
 
 from app.settings import SITE_TITLE, VERSION
 
-from data.models.inventory import Item
+from ui.decorators import inventory_cached, inventory_conditional
 
+from data import export
+from data.models.inventory import STOCK_STATE_COLUMNS
+from data.shopping import shopping_lists
 
+
+@inventory_cached
 def default_view(request):
     """ Process homepage url '/' and render the template 'home.html' """
 
-    running_out = []
-    to_buy = []
-
-    for i in Item.objects.running_out():
-        if 0 == i.stock_age_percent:
-            to_buy.append(i)
-        else:
-            running_out.append(i)
-
-    if 1 > len(running_out):
-        running_out = None
-
-    if 1 > len(to_buy):
-        to_buy = None
+    lists = shopping_lists()
 
     return render(request, 'home.html',
                   {'site_title': SITE_TITLE,
                    'site_version': ('v%d.%d %s' % VERSION).strip(),
-                   'running_out_list': running_out,
-                   'to_buy_list': to_buy, })
+                   'running_out_list': lists.running_out or None,
+                   'to_buy_list': lists.to_buy or None, })
 
 
+@inventory_conditional
 def download_to_buy_view(request):
-    """ Out put "to buy" list as downloadable text file """
-
-    to_buy = []
-
-    for i in Item.objects.running_out():
-        if 0 == i.stock_age_percent:
-            to_buy.append(i)
-
-    if 1 > len(to_buy):
-        to_buy = None
-
-    response = render(request, 'download.txt', {'to_buy_list': to_buy, })
-    response['content-type'] = 'application/octet-stream'
-    response['content-disposition'] = 'filename=shopping-list-%s.txt' % (
-        datetime.date.today().strftime('%Y-%m-%d'), )
+    """
+    Stream the "to buy" list as a downloadable file, in the format given by
+    the "format" query parameter; txt (default), csv, json or md.
+    List is read from the same shopping lists snapshot the homepage shows.
+
+    """
+
+    try:
+        serializer, content_type, extension = export.FORMATS[
+            request.GET.get('format', 'txt')]
+    except KeyError:
+        raise Http404('Unknown download format')
+
+    rows = (tuple(getattr(i, n) for n in STOCK_STATE_COLUMNS)
+            for i in shopping_lists().to_buy)
+
+    response = StreamingHttpResponse(serializer(rows),
+                                     content_type=content_type)
+    response['content-disposition'] = (
+        'attachment; filename=shopping-list-%s.%s' % (
+            datetime.date.today().strftime('%Y-%m-%d'), extension))
 
     return response
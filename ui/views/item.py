@@ -23,26 +23,52 @@ import json
 from django.contrib import messages
 from django.http import HttpResponse
 from django.shortcuts import render, redirect
+from django.utils.http import urlquote
 
-from app.settings import SITE_TITLE, VERSION
+from app.settings import SITE_TITLE, VERSION, ITEMS_PAGE_SIZE
 
+from ui.decorators import inventory_conditional
 from ui.forms import ItemForm
 
 from data.models.inventory import Item
 
 
+@inventory_conditional
 def list_view(request):
     """
     Process items maintenance url '/item-maintenance' and render the template
-    'items.html'
+    'items.html'.
+    Items are listed ITEMS_PAGE_SIZE at a time, continuing after the item name
+    given in "after" parameter. When "rows" parameter is present, only the
+    table rows are rendered for appending to an already loaded page.
 
     """
 
-    item_list = Item.objects.all()
+    item_list = Item.objects.with_last_purchase()
+
+    if request.GET.get('after'):
+        item_list = item_list.filter(name__gt=request.GET['after'])
+
+    item_list = item_list[:ITEMS_PAGE_SIZE]
+
+    next_page = None
+    if ITEMS_PAGE_SIZE == len(item_list):
+        next_page = item_list[ITEMS_PAGE_SIZE - 1].name
+
+    if 'rows' in request.GET:
+        response = render(request, 'items/rows.html',
+                          {
+                              'item_list': item_list,
+                              'site_version': ('v%d.%d %s' % VERSION).strip()
+                          })
+        response['X-Next-Page'] = urlquote(next_page or '')
+
+        return response
 
     return render(request, 'items/list.html',
                   {
                       'item_list': item_list,
+                      'next_page': next_page,
                       'site_title': SITE_TITLE + ' - Item Maintenance',
                       'site_version': ('v%d.%d %s' % VERSION).strip()
                   })
@@ -51,6 +77,8 @@ def list_view(request):
 def form_view(request, itemid=''):
     """
     Render item maintenance (add/edit) form, and handle the submitted data.
+    Not validated with the inventory state, since the form carries the CSRF
+    token of the user.
 
     """
 
@@ -20,17 +20,23 @@
 
 import json
 
-from django.http import HttpResponse
+from django.http import (HttpResponse, HttpResponseBadRequest,
+                         HttpResponseNotAllowed)
 from django.shortcuts import render
 from django.utils.datastructures import MultiValueDictKeyError
 
-from ui.forms import PurchaseForm
+from ui.forms import PurchaseForm, BulkPurchaseFormSet
 
-from data.models.inventory import Item
+from data.models.inventory import Item, Purchase
 
 
 def form_view(request):
-    """ Render item purchase form, and handle the submitted data. """
+    """
+    Render item purchase form, and handle the submitted data.
+    Not validated with the inventory state, since the form carries the CSRF
+    token of the user.
+
+    """
 
     form = None
     item = Item()
@@ -61,3 +67,60 @@ def form_view(request):
 
     return render(request, 'items/purchase.html', {'form': form,
                                                    'item': item})
+
+
+def bulk_view(request):
+    """
+    Validate and save a list of purchases submitted together.
+    Purchases are accepted as a JSON list of {"item", "date", "quantity"}
+    objects, or as standard form set data, and saved only when all of them are
+    valid.
+
+    """
+
+    if 'POST' != request.method:
+        return HttpResponseNotAllowed(['POST'])
+
+    if request.META.get('CONTENT_TYPE', '').startswith('application/json'):
+        try:
+            rows = json.loads(request.body.decode('utf-8'))
+        except ValueError:
+            return HttpResponseBadRequest()
+
+        if (not isinstance(rows, list) or
+                not all(isinstance(row, dict) for row in rows)):
+            return HttpResponseBadRequest()
+
+        data = {
+            'form-TOTAL_FORMS': str(len(rows)),
+            'form-INITIAL_FORMS': '0',
+        }
+        for n, row in enumerate(rows):
+            for field in ['item', 'date', 'quantity']:
+                data['form-%d-%s' % (n, field)] = row.get(field)
+    else:
+        data = request.POST
+
+    formset = BulkPurchaseFormSet(data=data, queryset=Purchase.objects.none())
+
+    if not formset.is_valid():
+        result = {
+            'code': 1,
+            'message': 'invalid',
+            'errors': formset.errors,
+            'non_form_errors': formset.non_form_errors(),
+        }
+
+        return HttpResponseBadRequest(json.dumps(result),
+                                      content_type='application/json')
+
+    purchases = formset.save(commit=False)
+    Purchase.objects.bulk_record(purchases)
+
+    result = {
+        'code': 0,
+        'message': 'success',
+        'count': len(purchases),
+    }
+
+    return HttpResponse(json.dumps(result), content_type='application/json')
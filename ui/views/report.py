@@ -0,0 +1,78 @@
+#  ui/views/report.py: UI views for the reports
+#
+#  Copyright 2014 Sudaraka Wijesinghe <sudaraka.org/contact>
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Report views """
+
+import csv
+import datetime
+
+from django.http import Http404, HttpResponse
+from django.shortcuts import render
+
+from app.settings import SITE_TITLE, VERSION
+
+from ui.decorators import inventory_cached
+
+from data.models.rollup import PurchaseRollup
+
+
+@inventory_cached
+def monthly_purchase_view(request):
+    """
+    Render the purchases of a month, given as "month" parameter in YYYY-MM
+    format (current month by default), from the monthly rollups.
+    When "format" parameter is "csv" the report is out put as a CSV file.
+
+    """
+
+    try:
+        month = datetime.datetime.strptime(
+            request.GET.get('month') or
+            datetime.date.today().strftime('%Y-%m'), '%Y-%m').date()
+    except ValueError:
+        raise Http404('Invalid month')
+
+    rollups = PurchaseRollup.objects.for_month(month)
+
+    if 'csv' == request.GET.get('format'):
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['content-disposition'] = (
+            'attachment; filename=monthly-purchase-%s.csv' % (
+                month.strftime('%Y-%m'), ))
+
+        writer = csv.writer(response)
+        writer.writerow(['name', 'purchases', 'quantity', 'unit_symbol',
+                         'first_date', 'last_date'])
+        for r in rollups:
+            writer.writerow([r.item.name, r.count, r.quantity,
+                             r.item.unit_symbol, r.first_date, r.last_date])
+
+        return response
+
+    previous_month, next_month = PurchaseRollup.objects.adjacent_months(month)
+
+    return render(request, 'reports/monthly_purchase.html',
+                  {
+                      'month': month,
+                      'rollup_list': rollups,
+                      'totals': PurchaseRollup.objects.totals(month),
+                      'previous_month': previous_month,
+                      'next_month': next_month,
+                      'site_title': SITE_TITLE + ' - Monthly Purchase',
+                      'site_version': ('v%d.%d %s' % VERSION).strip()
+                  })